@@ -0,0 +1,194 @@
+#
+# Benchmark Engines
+#
+# Compare the speed of the engines for running contests: Golly
+# (QuickLife), the per-cell NumPy engine, the bit-sliced NumPy
+# engine, the rule-table engine, the tiled engine, and the threaded
+# engine. The toroids have the sizes that dimensions() produces late
+# in a run, when the seed areas approach max_area_last. Each engine
+# is timed on single contests and, for the NumPy engines, on one
+# stacked batch of contests, as in update_history_all(). Finally,
+# the cost of writing the seeds into Golly at the start of a trial
+# is timed, cell by cell and with one cell list per seed, and the
+# cost of setting up the Golly universe for a trial is timed, with
+# and without reusing layers.
+#
+import golly as g
+import model_classes as mclass
+import model_functions as mfunc
+import model_engine as meng
+import model_parameters as mparam
+import time
+#
+# Seed sizes to test, given as [xspan, yspan]. The largest span of
+# the two seeds determines the size of the toroid; for example,
+# a span of 17 gives a 102 x 51 toroid that runs for 918 steps.
+#
+seed_sizes = [[5, 5], [10, 10], [13, 13], [10, 17], [5, 34]]
+#
+# Number of contests for each seed size.
+#
+num_contests = 20
+#
+# Engines to compare.
+#
+numpy_engines = ["numpy", "bitplane", "table", "tiled", "threaded"]
+#
+# File for the results. Use suffix "tsv" for tab-separated values.
+#
+benchmark_path = mparam.log_directory + "/benchmark-engines.tsv"
+benchmark_handle = open(benchmark_path, "w")
+#
+width_factor = mparam.width_factor
+height_factor = mparam.height_factor
+time_factor = mparam.time_factor
+seed_density = mparam.seed_density
+#
+mfunc.show_message(g, benchmark_handle, "\n\nBenchmark Engines\n\n")
+mfunc.show_message(g, benchmark_handle, "size\ttoroid\tsteps\tengine" + \
+  "\tseconds per contest\tcell updates per second\n")
+#
+for [xspan, yspan] in seed_sizes:
+  #
+  # Make random seeds of the given size, coloured red (s1) and
+  # blue (s2), and random placements for the contests.
+  #
+  contests = []
+  for k in range(num_contests):
+    s1 = mclass.Seed(xspan, yspan, mparam.pop_size)
+    s1.randomize(seed_density)
+    s1.num_living = s1.count_ones()
+    s2 = mclass.Seed(xspan, yspan, mparam.pop_size)
+    s2.randomize(seed_density)
+    s2.num_living = s2.count_ones()
+    s2.red2blue()
+    contests.append([s1, s2])
+  [g_width, g_height, g_time] = mfunc.dimensions(s1, s2, \
+    width_factor, height_factor, time_factor)
+  placements = []
+  for [s1, s2] in contests:
+    [x1, y1, x2, y2] = mfunc.random_placement(s1, s2, g_width, g_height)
+    placements.append([s1.cells, x1, y1, s2.cells, x2, y2])
+  cell_updates = g_width * g_height * g_time * num_contests
+  size_label = str(xspan) + "x" + str(yspan) + "\t" + \
+    str(g_width) + "x" + str(g_height) + "\t" + str(g_time)
+  #
+  # Golly (QuickLife), one contest at a time.
+  #
+  saved_engine = mparam.contest_engine
+  mparam.contest_engine = "golly"
+  start = time.time()
+  for [s1, s2] in contests:
+    mfunc.contest_colours(g, s1, s2, g_width, g_height, g_time)
+  seconds = time.time() - start
+  mparam.contest_engine = saved_engine
+  mfunc.show_message(g, benchmark_handle, size_label + "\tgolly" + \
+    "\t{:.4f}\t{:.0f}\n".format(seconds / num_contests, \
+    cell_updates / seconds))
+  #
+  # NumPy engines, one contest at a time and as one batch.
+  #
+  for engine in numpy_engines:
+    start = time.time()
+    for [cells1, x1, y1, cells2, x2, y2] in placements:
+      meng.torus_contest(cells1, x1, y1, cells2, x2, y2, \
+        g_width, g_height, g_time, engine, mparam.cycle_interval)
+    seconds = time.time() - start
+    mfunc.show_message(g, benchmark_handle, size_label + "\t" + engine + \
+      "\t{:.4f}\t{:.0f}\n".format(seconds / num_contests, \
+      cell_updates / seconds))
+    start = time.time()
+    meng.torus_contest_batch(placements, g_width, g_height, g_time, \
+      engine, mparam.max_batch, mparam.cycle_interval)
+    seconds = time.time() - start
+    mfunc.show_message(g, benchmark_handle, size_label + "\t" + engine + \
+      " batch\t{:.4f}\t{:.0f}\n".format(seconds / num_contests, \
+      cell_updates / seconds))
+#
+# Setup cost of a trial in Golly: writing the two seeds into the
+# toroid one cell at a time with g.setcell(), as Seed.insert() used
+# to do, versus one g.putcells() call with a cell list, as
+# Seed.insert() does now.
+#
+mfunc.show_message(g, benchmark_handle, "\nsize\ttoroid\tinsert" + \
+  "\tseconds per trial\n")
+#
+for [xspan, yspan] in seed_sizes:
+  s1 = mclass.Seed(xspan, yspan, mparam.pop_size)
+  s1.randomize(seed_density)
+  s2 = mclass.Seed(xspan, yspan, mparam.pop_size)
+  s2.randomize(seed_density)
+  s2.red2blue()
+  [g_width, g_height, g_time] = mfunc.dimensions(s1, s2, \
+    width_factor, height_factor, time_factor)
+  [g_xmin, g_xmax, g_ymin, g_ymax] = mfunc.torus_minmax(g_width, g_height)
+  size_label = str(xspan) + "x" + str(yspan) + "\t" + \
+    str(g_width) + "x" + str(g_height)
+  g.new("Management")
+  g.setrule("Management:T" + str(g_width) + "," + str(g_height))
+  #
+  # before: g.setcell() for every cell of both seeds
+  #
+  start = time.time()
+  for k in range(num_contests):
+    for s in [s1, s2]:
+      for s_x in range(s.xspan):
+        for s_y in range(s.yspan):
+          g.setcell(g_xmin + s_x, g_ymin + s_y, s.cells[s_x][s_y])
+  seconds = time.time() - start
+  mfunc.show_message(g, benchmark_handle, size_label + "\tsetcell" + \
+    "\t{:.6f}\n".format(seconds / num_contests))
+  #
+  # after: one g.putcells() for each seed
+  #
+  start = time.time()
+  for k in range(num_contests):
+    s1.insert(g, g_xmin, -1, g_ymin, g_ymax)
+    s2.insert(g, +1, g_xmax, g_ymin, g_ymax)
+  seconds = time.time() - start
+  mfunc.show_message(g, benchmark_handle, size_label + "\tputcells" + \
+    "\t{:.6f}\n".format(seconds / num_contests))
+#
+# Fixed cost of a trial in Golly: setting up a new universe for every
+# trial, as contest_colours() does with golly_layers = 0, versus
+# clearing a reused layer from a GollySession. The cost matters most
+# for the small seeds early in a run, so we use the smallest size.
+#
+mfunc.show_message(g, benchmark_handle, "\ntoroid\tsetup" + \
+  "\tseconds per trial\n")
+#
+[xspan, yspan] = seed_sizes[0]
+s1 = mclass.Seed(xspan, yspan, mparam.pop_size)
+[g_width, g_height, g_time] = mfunc.dimensions(s1, s1, \
+  width_factor, height_factor, time_factor)
+size_label = str(g_width) + "x" + str(g_height)
+#
+# before: a new universe for every trial
+#
+start = time.time()
+for k in range(num_contests):
+  g.setalgo("QuickLife")
+  g.autoupdate(False)
+  g.new("Management")
+  g.setrule("Management:T" + str(g_width) + "," + str(g_height))
+  g.setmag(mfunc.set_mag(g))
+seconds = time.time() - start
+mfunc.show_message(g, benchmark_handle, size_label + "\tnew" + \
+  "\t{:.6f}\n".format(seconds / num_contests))
+#
+# after: clear a reused layer
+#
+session = mclass.GollySession("Management", 1)
+start = time.time()
+for k in range(num_contests):
+  session.prepare(g, g_width, g_height, "QuickLife")
+seconds = time.time() - start
+mfunc.show_message(g, benchmark_handle, size_label + "\tsession" + \
+  "\t{:.6f}\n".format(seconds / num_contests))
+#
+# Final message.
+#
+mfunc.show_message(g, benchmark_handle, "\nBenchmark complete.\n")
+benchmark_handle.close()
+#
+#
@@ -0,0 +1,92 @@
+#
+# Calibrate Algos
+#
+# Time the two Golly algorithms, QuickLife and HashLife, on contests
+# between random seeds, for the toroid sizes and numbers of steps
+# that occur during a run, from the small seeds at the start up to
+# the large seeds that fusion makes late in a run. The average
+# seconds per contest for each algorithm are written to
+# algo_model_path, as the cost model that choose_algo() uses when
+# golly_algo is "auto" in model_parameters.py.
+#
+import golly as g
+import model_classes as mclass
+import model_functions as mfunc
+import model_parameters as mparam
+import random as rand
+import time
+#
+# Seed sizes to calibrate, given as [xspan, yspan]. The largest span
+# of the two seeds determines the size of the toroid and the number
+# of steps; for example, a span of 17 gives a 102 x 51 toroid that
+# runs for 918 steps.
+#
+seed_sizes = [[5, 5], [7, 7], [10, 10], [13, 13], [17, 17], \
+  [24, 24], [34, 34], [48, 48]]
+#
+# Number of contests for each seed size and algorithm.
+#
+num_contests = 10
+#
+width_factor = mparam.width_factor
+height_factor = mparam.height_factor
+time_factor = mparam.time_factor
+seed_density = mparam.seed_density
+#
+# Run the contests in Golly, with each algorithm in turn.
+#
+saved_engine = mparam.contest_engine
+saved_algo = mparam.golly_algo
+mparam.contest_engine = "golly"
+#
+model_handle = open(mparam.algo_model_path, "w")
+model_handle.write("width\theight\tsteps\t" + \
+  "\t".join(mfunc.golly_algos) + "\n")
+#
+for [xspan, yspan] in seed_sizes:
+  #
+  # Make random seeds of the given size, coloured red (s1) and
+  # blue (s2).
+  #
+  contests = []
+  for k in range(num_contests):
+    s1 = mclass.Seed(xspan, yspan, mparam.pop_size)
+    s1.randomize(seed_density)
+    s1.num_living = s1.count_ones()
+    s2 = mclass.Seed(xspan, yspan, mparam.pop_size)
+    s2.randomize(seed_density)
+    s2.num_living = s2.count_ones()
+    s2.red2blue()
+    contests.append([s1, s2])
+  [g_width, g_height, g_time] = mfunc.dimensions(s1, s2, \
+    width_factor, height_factor, time_factor)
+  #
+  # Time each algorithm on the same contests, with the same random
+  # placements of the seeds.
+  #
+  placement_seed = rand.random()
+  seconds = []
+  for algo in mfunc.golly_algos:
+    mparam.golly_algo = algo
+    rand.seed(placement_seed)
+    start = time.time()
+    for [s1, s2] in contests:
+      mfunc.contest_colours(g, s1, s2, g_width, g_height, g_time)
+    seconds.append((time.time() - start) / num_contests)
+  model_handle.write(str(g_width) + "\t" + str(g_height) + "\t" + \
+    str(g_time) + "\t" + \
+    "\t".join(["{:.6f}".format(s) for s in seconds]) + "\n")
+  g.show(str(g_width) + "x" + str(g_height) + ", " + str(g_time) + \
+    " steps: " + ", ".join([algo + " {:.4f}".format(s) for \
+    (algo, s) in zip(mfunc.golly_algos, seconds)]) + " seconds per contest")
+#
+model_handle.close()
+mparam.contest_engine = saved_engine
+mparam.golly_algo = saved_algo
+mfunc.algo_model = None # read the new cost model when it is next needed
+#
+# Final message.
+#
+g.show("Calibration complete: " + mparam.algo_model_path)
+#
+#
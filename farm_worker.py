@@ -0,0 +1,32 @@
+#
+# Farm Worker
+#
+# Run contests for a farm of Golly workers on one machine (see
+# model_farm.py). Start one Golly instance for each core and run this
+# script in each of them; then run run_model.py with farm_mode set to
+# "golly" in model_parameters.py. The workers take jobs from
+# farm_directory and write the scores back, until the file "stop" is
+# put in farm_directory.
+#
+import golly as g
+import model_farm as mfarm
+import model_functions as mfunc
+import model_parameters as mparam
+import os
+#
+farm_directory = mparam.farm_directory
+if (not os.path.exists(farm_directory)):
+  os.makedirs(farm_directory)
+#
+# Each worker needs a name that is unique on the machine.
+#
+worker_name = "worker-" + str(os.getpid())
+#
+g.show("Farm worker " + worker_name + " is waiting for jobs in " + \
+  farm_directory)
+num_jobs = mfarm.serve_jobs(g, farm_directory, worker_name, \
+  mfunc.score_pair, False)
+g.show("Farm worker " + worker_name + " stopped after " + \
+  str(num_jobs) + " jobs")
+#
+#
@@ -0,0 +1,487 @@
+"""
+Golly Shim
+
+A stand-in for the golly module, built on the NumPy engines in
+model_engine.py, so that Model-S can run as a plain Python process,
+without the Golly application. It implements the part of the Golly
+scripting API that Model-S uses. To use it, put the headless
+directory first on the Python path, so that "import golly" finds
+headless/golly.py, which imports everything from this module:
+
+  PYTHONPATH=headless python run_model.py
+
+Messages from g.show() and g.note() go to the "golly" logger.
+"""
+import numpy as np
+import model_engine as meng
+import logging
+import zlib
+import os
+"""
+Universes
+"""
+#
+# Note: a universe is either a toroid (a bounded grid, as set with
+# a rule such as "Management:T60,30") or an infinite plane (a rule
+# without ":T"). The cells are stored in a grid indexed as
+# grid[x - x_origin][y - y_origin], following model_engine.py. For a
+# toroid of width w and height h, the grid covers the same cells as
+# in Golly: x from -int(w / 2) to w - int(w / 2) - 1, and likewise
+# for y. For a plane, the grid grows when cells are set outside it,
+# and as the pattern grows, with a border of white cells kept around
+# the pattern while it runs.
+#
+logger = logging.getLogger("golly")
+#
+# Golly allows at most ten layers.
+#
+max_layers = 10
+#
+class Universe:
+  """
+  A class for the state of one Golly layer.
+  """
+  #
+  # __init__(self) -- returns NULL
+  #
+  def __init__(self):
+    """
+    Make an empty Life universe on an infinite plane.
+    """
+    self.rule_name = "Life"
+    self.g_width = 0 # 0 for an infinite plane
+    self.g_height = 0 # 0 for an infinite plane
+    self.grid = np.zeros((0, 0), dtype=np.uint8)
+    self.x_origin = 0
+    self.y_origin = 0
+    self.generation = 0
+    self.algo = "QuickLife"
+    self.selection = []
+  #
+  # clear_cells(self) -- returns NULL
+  #
+  def clear_cells(self):
+    """
+    Make every cell white.
+    """
+    if (self.g_width > 0):
+      self.grid = np.zeros((self.g_width, self.g_height), dtype=np.uint8)
+      self.x_origin = - int(self.g_width / 2)
+      self.y_origin = - int(self.g_height / 2)
+    else:
+      self.grid = np.zeros((0, 0), dtype=np.uint8)
+      self.x_origin = 0
+      self.y_origin = 0
+  #
+  # live_cells(self) -- returns [xs, ys, states]
+  #
+  def live_cells(self):
+    """
+    Return the Golly coordinates and states of the cells that are
+    not white, sorted by y and then by x, as in Golly cell lists.
+    """
+    (ys, xs) = np.nonzero(self.grid.T)
+    states = self.grid[xs, ys]
+    return [xs + self.x_origin, ys + self.y_origin, states]
+  #
+  # grow(self, x_min, x_max, y_min, y_max) -- returns NULL
+  #
+  def grow(self, x_min, x_max, y_min, y_max):
+    """
+    Make sure that the grid of a plane covers the cells from
+    (x_min, y_min) to (x_max, y_max), inclusive.
+    """
+    (xspan, yspan) = self.grid.shape
+    if (xspan == 0):
+      self.grid = np.zeros((x_max - x_min + 1, y_max - y_min + 1), \
+        dtype=np.uint8)
+      self.x_origin = x_min
+      self.y_origin = y_min
+      return
+    left = max(0, self.x_origin - x_min)
+    right = max(0, x_max - (self.x_origin + xspan - 1))
+    top = max(0, self.y_origin - y_min)
+    bottom = max(0, y_max - (self.y_origin + yspan - 1))
+    if (left + right + top + bottom > 0):
+      self.grid = np.pad(self.grid, ((left, right), (top, bottom)))
+      self.x_origin -= left
+      self.y_origin -= top
+  #
+  # index(self, x, y) -- returns [i, j]
+  #
+  def index(self, x, y):
+    """
+    Convert Golly coordinates to grid indexes. On a plane, the grid
+    grows to cover the cell; on a toroid, the cell must be inside
+    the toroid, as in Golly.
+    """
+    if (self.g_width == 0):
+      self.grow(x, x, y, y)
+    i = x - self.x_origin
+    j = y - self.y_origin
+    if ((i < 0) or (j < 0) or (i >= self.grid.shape[0]) or \
+      (j >= self.grid.shape[1])):
+      raise ValueError("cell is outside grid: " + str([x, y]))
+    return [i, j]
+  #
+  # step(self) -- returns NULL
+  #
+  def step(self):
+    """
+    Run the universe for one step.
+    """
+    if (self.g_width == 0):
+      if (self.grid.size == 0):
+        return
+      # keep a border of white cells around the pattern, so that the
+      # wrap-around of the NumPy engine does no harm
+      if (self.grid[0, :].any() or self.grid[-1, :].any() or \
+        self.grid[:, 0].any() or self.grid[:, -1].any()):
+        (xspan, yspan) = self.grid.shape
+        self.grow(self.x_origin - meng.plane_margin, \
+          self.x_origin + xspan - 1 + meng.plane_margin, \
+          self.y_origin - meng.plane_margin, \
+          self.y_origin + yspan - 1 + meng.plane_margin)
+    self.grid = rule_step(self.rule_name, self.grid)
+#
+# rule_step(rule_name, grid) -- returns new_grid
+#
+def rule_step(rule_name, grid):
+  """
+  Apply one step of the named rule to a toroidal grid.
+  """
+  if (rule_name == "Life"):
+    return meng.life_step(grid)
+  if (rule_name == "Management"):
+    return meng.management_step(grid)
+  return meng.table_step(grid, meng.load_rule_table(rule_name))
+#
+# The layers, and the index of the current layer.
+#
+layers = [Universe()]
+current = 0
+#
+# universe() -- returns the current universe
+#
+def universe():
+  """
+  Return the universe of the current layer.
+  """
+  return layers[current]
+"""
+Golly scripting API
+"""
+#
+# new(title) -- returns NULL
+#
+def new(title):
+  """
+  Make the current universe empty. The rule and the algorithm stay
+  the same, as in Golly.
+  """
+  u = universe()
+  u.clear_cells()
+  u.generation = 0
+#
+# setrule(rule) -- returns NULL
+#
+def setrule(rule):
+  """
+  Set the rule of the current universe, such as "Life",
+  "Management", or "Management:T60,30" (a toroid). The cells are
+  kept, except for cells outside a new toroid.
+  """
+  u = universe()
+  [xs, ys, states] = u.live_cells()
+  if (":T" in rule):
+    [rule_name, size] = rule.split(":T")
+    [g_width, g_height] = [int(n) for n in size.split(",")]
+  else:
+    [rule_name, g_width, g_height] = [rule, 0, 0]
+  if (rule_name == "B3/S23"):
+    rule_name = "Life"
+  u.rule_name = rule_name
+  u.g_width = g_width
+  u.g_height = g_height
+  u.clear_cells()
+  for (x, y, state) in zip(xs, ys, states):
+    if ((g_width == 0) or ((u.x_origin <= x < u.x_origin + g_width) and \
+      (u.y_origin <= y < u.y_origin + g_height))):
+      setcell(int(x), int(y), int(state))
+#
+# getrule() -- returns rule
+#
+def getrule():
+  """
+  Return the rule of the current universe.
+  """
+  u = universe()
+  rule_name = "B3/S23" if (u.rule_name == "Life") else u.rule_name
+  if (u.g_width == 0):
+    return rule_name
+  return rule_name + ":T" + str(u.g_width) + "," + str(u.g_height)
+#
+# numstates() -- returns the number of states of the current rule
+#
+def numstates():
+  """
+  Return the number of states in the rule of the current universe.
+  """
+  u = universe()
+  if (u.rule_name == "Life"):
+    return 2
+  return meng.load_rule_table(u.rule_name).shape[0]
+#
+# setalgo(algo) -- returns NULL
+#
+def setalgo(algo):
+  """
+  Record the algorithm. All algorithms give the same results, so
+  the shim always uses the NumPy engines.
+  """
+  universe().algo = algo
+#
+# getalgo() -- returns algo
+#
+def getalgo():
+  return universe().algo
+#
+# setcell(x, y, state) -- returns NULL
+#
+def setcell(x, y, state):
+  u = universe()
+  if ((state == 0) and (u.g_width == 0)):
+    # do not grow the plane just to write a white cell
+    i = x - u.x_origin
+    j = y - u.y_origin
+    if ((0 <= i < u.grid.shape[0]) and (0 <= j < u.grid.shape[1])):
+      u.grid[i, j] = 0
+    return
+  [i, j] = u.index(x, y)
+  u.grid[i, j] = state
+#
+# getcell(x, y) -- returns state
+#
+def getcell(x, y):
+  u = universe()
+  i = x - u.x_origin
+  j = y - u.y_origin
+  if ((0 <= i < u.grid.shape[0]) and (0 <= j < u.grid.shape[1])):
+    return int(u.grid[i, j])
+  if (u.g_width > 0):
+    raise ValueError("cell is outside grid: " + str([x, y]))
+  return 0
+#
+# putcells(cell_list, x0, y0, axx, axy, ayx, ayy, mode) -- returns NULL
+#
+def putcells(cell_list, x0 = 0, y0 = 0, axx = 1, axy = 0, ayx = 0, \
+  ayy = 1, mode = "or"):
+  """
+  Write a Golly cell list into the current universe, with the given
+  offset and transformation. A list with an odd number of members
+  is a multi-state list [x1, y1, state1, ...], possibly with a final
+  0; otherwise it is a two-state list [x1, y1, x2, y2, ...]. Only
+  the modes "or" and "copy" are supported, and they act the same
+  here, since white cells are never in a cell list.
+  """
+  assert mode in ["or", "copy"]
+  if (len(cell_list) == 0):
+    return
+  if (len(cell_list) % 2 == 1):
+    num_cells = len(cell_list) // 3
+    cells = np.array(cell_list[0:(3 * num_cells)], \
+      dtype=np.int64).reshape((num_cells, 3))
+  else:
+    pairs = np.array(cell_list, dtype=np.int64).reshape((-1, 2))
+    cells = np.concatenate([pairs, np.ones((len(pairs), 1), \
+      dtype=np.int64)], axis=1)
+  xs = x0 + axx * cells[:, 0] + axy * cells[:, 1]
+  ys = y0 + ayx * cells[:, 0] + ayy * cells[:, 1]
+  u = universe()
+  if (u.g_width == 0):
+    u.grow(int(xs.min()), int(xs.max()), int(ys.min()), int(ys.max()))
+  i = xs - u.x_origin
+  j = ys - u.y_origin
+  if ((i.min() < 0) or (j.min() < 0) or (i.max() >= u.grid.shape[0]) or \
+    (j.max() >= u.grid.shape[1])):
+    raise ValueError("putcells: cells are outside grid")
+  u.grid[i, j] = cells[:, 2]
+#
+# getcells(rect) -- returns cell_list
+#
+def getcells(rect):
+  """
+  Return a Golly cell list of the cells in the given rectangle
+  [x, y, width, height] that are not white.
+  """
+  if (len(rect) == 0):
+    return []
+  [x, y, width, height] = rect
+  [xs, ys, states] = universe().live_cells()
+  inside = (xs >= x) & (xs < x + width) & (ys >= y) & (ys < y + height)
+  if (numstates() == 2):
+    return np.stack([xs[inside], ys[inside]], axis=1).ravel().tolist()
+  cell_list = np.stack([xs[inside], ys[inside], states[inside]], \
+    axis=1).ravel().tolist()
+  if ((len(cell_list) > 0) and (len(cell_list) % 2 == 0)):
+    cell_list.append(0)
+  return cell_list
+#
+# getrect() -- returns rect
+#
+def getrect():
+  """
+  Return the bounding box [x, y, width, height] of the cells that
+  are not white, or [] if there are none.
+  """
+  [xs, ys, states] = universe().live_cells()
+  if (len(xs) == 0):
+    return []
+  return [int(xs.min()), int(ys.min()), int(xs.max() - xs.min() + 1), \
+    int(ys.max() - ys.min() + 1)]
+#
+# getpop() -- returns population
+#
+def getpop():
+  """
+  Return the number of cells that are not white, as a string.
+  """
+  return str(int(np.count_nonzero(universe().grid)))
+#
+# hash(rect) -- returns hash
+#
+def hash(rect):
+  """
+  Return a 32-bit hash of the cells in the given rectangle.
+  """
+  cell_list = getcells(rect)
+  cells = np.array(cell_list, dtype=np.int64)
+  cells[0::3] -= rect[0]
+  cells[1::3] -= rect[1]
+  return zlib.crc32(cells.tobytes()) - 2 ** 31
+#
+# run(num_steps) -- returns NULL
+#
+def run(num_steps):
+  u = universe()
+  for k in range(num_steps):
+    u.step()
+  u.generation += num_steps
+#
+# getgen() -- returns generation
+#
+def getgen():
+  return str(universe().generation)
+#
+# getwidth() -- returns width
+#
+def getwidth():
+  return universe().g_width
+#
+# getheight() -- returns height
+#
+def getheight():
+  return universe().g_height
+#
+# select(rect) -- returns NULL
+#
+def select(rect):
+  universe().selection = list(rect)
+#
+# clear(where) -- returns NULL
+#
+def clear(where):
+  """
+  Make the cells inside (where = 0) or outside (where = 1) the
+  selection white.
+  """
+  u = universe()
+  [x, y, width, height] = u.selection
+  (xspan, yspan) = u.grid.shape
+  xs = np.arange(xspan) + u.x_origin
+  ys = np.arange(yspan) + u.y_origin
+  inside = ((xs >= x) & (xs < x + width))[:, np.newaxis] & \
+    ((ys >= y) & (ys < y + height))[np.newaxis, :]
+  if (where == 0):
+    u.grid[inside] = 0
+  else:
+    u.grid[~ inside] = 0
+#
+# Layers
+#
+def addlayer():
+  global current
+  assert len(layers) < max_layers
+  layers.append(Universe())
+  current = len(layers) - 1
+  return current
+#
+def dellayer():
+  global current
+  assert len(layers) > 1
+  del layers[current]
+  current = min(current, len(layers) - 1)
+#
+def setlayer(index):
+  global current
+  assert 0 <= index < len(layers)
+  current = index
+#
+def getlayer():
+  return current
+#
+def numlayers():
+  return len(layers)
+#
+def maxlayers():
+  return max_layers
+#
+# Messages go to the "golly" logger.
+#
+def show(message):
+  logger.info(message)
+#
+def note(message):
+  logger.info(message)
+#
+def warn(message):
+  logger.warning(message)
+#
+def exit(message = ""):
+  if (message != ""):
+    logger.info(message)
+  raise SystemExit(message)
+#
+# Dialogs cannot be shown without Golly. opendialog() returns the
+# value of the environment variable GOLLY_DIALOG, or "" (meaning that
+# the user cancelled) when it is not set.
+#
+def opendialog(title = "", filetypes = "", initialdir = "", \
+  initialfname = "", mustexist = True):
+  return os.environ.get("GOLLY_DIALOG", "")
+#
+def getdir(dirname):
+  return os.getcwd() + os.sep
+#
+# The viewer does not exist without Golly, so these do nothing.
+#
+def update():
+  return
+#
+def autoupdate(flag):
+  return
+#
+def fit():
+  return
+#
+def setmag(mag):
+  return
+#
+def getmag():
+  return 0
+#
+def setcolors(colours):
+  return
+#
+#
+#
@@ -0,0 +1,17 @@
+#
+# Golly
+#
+# A headless stand-in for the golly module. Put this directory first
+# on the Python path to run Model-S without the Golly application:
+#
+#   PYTHONPATH=headless python run_model.py
+#
+# See golly_shim.py in the Model-S directory.
+#
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from golly_shim import *
+#
+#
+#
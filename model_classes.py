@@ -92,6 +92,20 @@ class Seed:
           return False
     return True
   #
+  # pack_bits(self) -- returns [live_bits, purple_bits] or None
+  #
+  def pack_bits(self):
+    """
+    Encode the seed as two packed bit arrays, one bit per cell: the
+    live plane (state 1) and the purple mask (state 5). Seeds with
+    any other states besides 0 cannot be encoded this way, so None
+    is returned for them.
+    """
+    cells = self.cells.ravel()
+    if (np.any((cells != 0) & (cells != 1) & (cells != 5))):
+      return None
+    return [np.packbits(cells == 1), np.packbits(cells == 5)]
+  #
   # shuffle(self) -- returns a shuffled copy of the given seed
   #
   def shuffle(self):
@@ -132,24 +146,59 @@ class Seed:
         if (self.cells[x][y] == 1):
           self.cells[x][y] = 2
   #
-  # insert(self, g, g_xmin, g_xmax, g_ymin, g_ymax) -- returns NULL
+  # random_location(self, g_xmin, g_xmax, g_ymin, g_ymax)
+  # -- returns [g_xstart, g_ystart]
+  #
+  def random_location(self, g_xmin, g_xmax, g_ymin, g_ymax):
+    """
+    Choose a random location for the top left corner of the seed,
+    such that the seed fits within the given bounds.
+    """
+    step = 1
+    g_xstart = rand.randrange(g_xmin, g_xmax - self.xspan, step)
+    g_ystart = rand.randrange(g_ymin, g_ymax - self.yspan, step)
+    return [g_xstart, g_ystart]
+  #
+  # insert(self, g, g_xmin, g_xmax, g_ymin, g_ymax)
+  # -- returns [g_xstart, g_ystart]
   #
   def insert(self, g, g_xmin, g_xmax, g_ymin, g_ymax):
     """
     Write the seed into the Golly grid at a random location
-    within the given bounds.
+    within the given bounds, and return the location of its
+    top left corner.
     g = the Golly universe
     s = a seed
     """
-    step = 1
-    g_xstart = rand.randrange(g_xmin, g_xmax - self.xspan, step)
-    g_ystart = rand.randrange(g_ymin, g_ymax - self.yspan, step)
-    for s_x in range(self.xspan):
-      for s_y in range(self.yspan):
-        g_x = g_xstart + s_x
-        g_y = g_ystart + s_y
-        s_state = self.cells[s_x][s_y]
-        g.setcell(g_x, g_y, s_state)
+    [g_xstart, g_ystart] = self.random_location(g_xmin, g_xmax, \
+      g_ymin, g_ymax)
+    # write all of the cells with one call to Golly; the white cells
+    # are left out, since the Golly grid is white to begin with
+    g.putcells(self.cell_list(g_xstart, g_ystart, True))
+    return [g_xstart, g_ystart]
+  #
+  # cell_list(self, g_xstart, g_ystart, multi_state) -- returns cell_list
+  #
+  def cell_list(self, g_xstart, g_ystart, multi_state):
+    """
+    Convert the seed into a Golly cell list, with the corner of the
+    seed at (g_xstart, g_ystart). White cells (state 0) are left out.
+    If multi_state is True, the list has the form [x1, y1, state1,
+    x2, y2, state2, ...], padded with a final 0 when needed to make
+    its length odd, as Golly requires for multi-state rules. If
+    multi_state is False, the list has the form [x1, y1, x2, y2, ...],
+    for two-state rules such as the Game of Life.
+    """
+    (s_x, s_y) = np.nonzero(self.cells)
+    if (multi_state == False):
+      return np.stack([s_x + g_xstart, s_y + g_ystart], \
+        axis=1).ravel().tolist()
+    s_state = self.cells[s_x, s_y]
+    cell_list = np.stack([s_x + g_xstart, s_y + g_ystart, s_state], \
+      axis=1).ravel().tolist()
+    if ((len(cell_list) > 0) and (len(cell_list) % 2 == 0)):
+      cell_list.append(0)
+    return cell_list
   #
   # random_rotate(self) -- returns new_seed
   #
@@ -466,6 +515,387 @@ class Seed:
     """
     return self.count_ones() / float(self.xspan * self.yspan)
   #
+"""
+Make a class for populations.
+"""
+#
+# Each seed's fitness is the average of its history, the scores it
+# won against every member of the population. Recomputing every
+# fitness to find the best or worst seed takes time proportional to
+# the square of the population size. A population keeps all of the
+# histories in one score matrix, with scores[i][j] = the score of
+# seed i against seed j, and keeps the row sums up to date as the
+# scores change, so that each fitness is always ready.
+#
+# A score is the average of num_trials trials, each worth 0, 0.5,
+# or 1 points, so it is a multiple of 0.5 / num_trials. The matrix
+# stores each score as the integer score * 2 * num_trials, in one
+# byte, and the row sums are exact.
+#
+# The similarity of two seeds is zero unless they have the same
+# shape and the same purple borders (see similarity() in
+# model_functions.py). A population groups its seeds into buckets by
+# shape and purple mask, and only keeps the similarities of seeds in
+# the same bucket; all other similarities are zero. The similarities
+# are stored sparsely, as a dictionary for each seed, and they are
+# only calculated when they are needed: the dictionary of a seed is
+# None until similarity_cache() in model_functions.py fills it in,
+# and replacing a seed sets the dictionaries of every seed in its old
+# and new buckets back to None. Only sexual reproduction reads the
+# similarities, so most runs never calculate most of them.
+#
+# A population also indexes its seeds by genome (see genome_key()),
+# and remembers the score matrix rows of the last memory seeds that
+# were replaced, along with the IDs of the seeds they were scored
+# against, so that a child with the same genome as a member or a
+# remembered seed can take over its scores (see transplant_history()
+# in model_functions.py).
+#
+# The population is a list of seeds, so it can be used wherever a
+# list of seeds is expected. Each seed's history is still kept up to
+# date, for pickles of seeds and for Seed.fitness(). The similarities
+# in the seeds themselves are only filled in when they are needed:
+# for a new child when it is stored (see update_similarity_all() in
+# model_functions.py) and for the elite when it is archived (see
+# archive_elite()).
+#
+class Population(list):
+  """
+  A class for populations of seeds, with their score matrix.
+  """
+  #
+  # __init__(self, seeds, num_trials, memory, orientation) -- returns NULL
+  #
+  def __init__(self, seeds, num_trials, memory, orientation):
+    """
+    Make a population from a list of seeds, whose addresses are their
+    positions in the list, with scores from num_trials trials. The
+    population remembers the rows of the last memory seeds that are
+    replaced; if orientation is True, genomes that are rotations or
+    reflections of each other are the same.
+    """
+    list.__init__(self, seeds)
+    assert 2 * num_trials <= 255 # a score must fit in one byte
+    self.num_trials = num_trials
+    self.unit = 2 * num_trials # scores are multiples of 1 / unit
+    pop_size = len(seeds)
+    self.scores = np.zeros((pop_size, pop_size), dtype=np.uint8)
+    self.row_sums = np.zeros(pop_size, dtype=np.int64)
+    # the packed bits of each seed, for similarity_row() in
+    # model_functions.py
+    self.bits = [None] * pop_size
+    # the bucket key of each seed, the addresses in each bucket, and
+    # the similarities of each seed to the seeds in its bucket, or
+    # None if they have not been calculated
+    self.bucket_keys = [None] * pop_size
+    self.buckets = {}
+    self.similar = [None] * pop_size
+    # the genome key of each seed, the addresses of each genome, and
+    # the remembered rows of replaced seeds, from oldest to newest,
+    # as a dictionary from genome key to [row, opponent IDs]
+    self.memory = memory
+    self.orientation = orientation
+    self.genome_keys = [None] * pop_size
+    self.genomes = {}
+    self.removed = {}
+    for i in range(pop_size):
+      self.load_row(i)
+      self.bits[i] = seeds[i].pack_bits()
+      self.add_to_bucket(i)
+      self.add_genome(i)
+  #
+  # encode(self, score) -- returns code
+  #
+  def encode(self, score):
+    """
+    Convert a score to its integer code in the score matrix.
+    """
+    code = int(round(score * self.unit))
+    assert abs(code - score * self.unit) < 1e-6
+    return code
+  #
+  # load_row(self, i) -- returns NULL
+  #
+  def load_row(self, i):
+    """
+    Copy the history of the seed at address i into row i of the
+    score matrix.
+    """
+    self.scores[i] = [self.encode(score) for score in self[i].history]
+    self.row_sums[i] = int(np.sum(self.scores[i], dtype=np.int64))
+  #
+  # __setitem__(self, i, seed) -- returns NULL
+  #
+  def __setitem__(self, i, seed):
+    """
+    Replace the seed at address i, taking its row of the score matrix
+    from its history. Column i keeps the old scores until they are
+    updated, as with the histories of the other seeds.
+    """
+    self.remember(i)
+    list.__setitem__(self, i, seed)
+    self.load_row(i)
+    self.bits[i] = seed.pack_bits()
+    # the similarities in the old bucket and the new bucket change
+    self.forget_similarities(i)
+    self.buckets[self.bucket_keys[i]].remove(i)
+    if (len(self.buckets[self.bucket_keys[i]]) == 0):
+      del self.buckets[self.bucket_keys[i]]
+    self.add_to_bucket(i)
+    self.forget_similarities(i)
+    self.add_genome(i)
+  #
+  # add_to_bucket(self, i) -- returns NULL
+  #
+  def add_to_bucket(self, i):
+    """
+    Put the seed at address i into the bucket for its shape and its
+    purple mask.
+    """
+    seed = self[i]
+    key = (seed.xspan, seed.yspan, np.packbits(seed.cells == 5).tobytes())
+    self.bucket_keys[i] = key
+    if (key not in self.buckets):
+      self.buckets[key] = set()
+    self.buckets[key].add(i)
+  #
+  # bucket(self, i) -- returns list of addresses
+  #
+  def bucket(self, i):
+    """
+    Return the addresses of the seeds in the same bucket as the seed
+    at address i (including i), in increasing order. Only these seeds
+    can have a similarity above zero to the seed at address i.
+    """
+    return sorted(self.buckets[self.bucket_keys[i]])
+  #
+  # genome_key(self, seed) -- returns key
+  #
+  def genome_key(self, seed):
+    """
+    Return a key that is the same for two seeds exactly when they have
+    the same cells (up to rotation and reflection, if orientation is
+    True).
+    """
+    cells = np.asarray(seed.cells, dtype=np.uint8)
+    if (not self.orientation):
+      return (cells.shape, cells.tobytes())
+    keys = []
+    for rotation in range(4):
+      rotated = np.rot90(cells, rotation)
+      for oriented in [rotated, np.flipud(rotated)]:
+        keys.append((oriented.shape, oriented.tobytes()))
+    return min(keys)
+  #
+  # add_genome(self, i) -- returns NULL
+  #
+  def add_genome(self, i):
+    """
+    Put the seed at address i into the index of genomes.
+    """
+    key = self.genome_key(self[i])
+    self.genome_keys[i] = key
+    if (key not in self.genomes):
+      self.genomes[key] = set()
+    self.genomes[key].add(i)
+  #
+  # remember(self, i) -- returns NULL
+  #
+  def remember(self, i):
+    """
+    Before the seed at address i is replaced, remove it from the index
+    of genomes and remember its row of the score matrix, with the IDs
+    of the seeds it was scored against.
+    """
+    key = self.genome_keys[i]
+    self.genomes[key].remove(i)
+    if (len(self.genomes[key]) == 0):
+      del self.genomes[key]
+    if (self.memory == 0):
+      return
+    self.removed.pop(key, None) # the newest row replaces an older one
+    self.removed[key] = [self.scores[i].copy(), \
+      [seed.unique_ID_num for seed in self]]
+    if (len(self.removed) > self.memory):
+      del self.removed[next(iter(self.removed))] # forget the oldest row
+  #
+  # duplicate_row(self, i) -- returns row
+  #
+  def duplicate_row(self, i):
+    """
+    Look for an earlier copy of the genome of the seed at address i,
+    among the other members and then among the remembered seeds.
+    Return the scores of the earlier copy that the seed at address i
+    can use, as a dictionary from address to integer score code, or
+    None if there is no earlier copy. The score against the earlier
+    copy itself and the scores against seeds that have been replaced
+    since the earlier copy met them are left out.
+    """
+    key = self.genome_keys[i]
+    others = sorted(self.genomes[key] - set([i]))
+    if (len(others) > 0):
+      k = others[0]
+      return dict((j, int(self.scores[k][j])) for j in range(len(self)) \
+        if ((j != i) and (j != k)))
+    if (key in self.removed):
+      [row, opponent_IDs] = self.removed[key]
+      return dict((j, int(row[j])) for j in range(len(self)) \
+        if ((j != i) and (opponent_IDs[j] == self[j].unique_ID_num)))
+    return None
+  #
+  # forget_similarities(self, i) -- returns NULL
+  #
+  def forget_similarities(self, i):
+    """
+    Mark the similarities of every seed in the same bucket as the
+    seed at address i as not calculated.
+    """
+    for j in self.buckets[self.bucket_keys[i]]:
+      self.similar[j] = None
+  #
+  # set_similarities(self, i, addresses, similarities) -- returns NULL
+  #
+  def set_similarities(self, i, addresses, similarities):
+    """
+    Record the similarities of the seed at address i to the seeds at
+    the given addresses, which are the seeds in its bucket. The
+    similarity of a seed to itself is one.
+    """
+    self.similar[i] = {}
+    for (j, sim) in zip(addresses, similarities):
+      if (sim != 0.0):
+        self.similar[i][j] = sim
+    self.similar[i][i] = 1.0
+  #
+  # set_score(self, i, j, score) -- returns NULL
+  #
+  def set_score(self, i, j, score):
+    """
+    Record the score of seed i against seed j, updating the fitness
+    of seed i in constant time.
+    """
+    code = self.encode(score)
+    self.row_sums[i] += code - int(self.scores[i][j])
+    self.scores[i][j] = code
+    self[i].history[j] = score
+  #
+  # fitnesses(self) -- returns array of fitness
+  #
+  def fitnesses(self):
+    """
+    Return the fitness of every seed, in order of address, equal to
+    Seed.fitness() for each seed.
+    """
+    return self.row_sums / float(self.unit * len(self))
+  #
+  # best_address(self) -- returns address
+  #
+  def best_address(self):
+    """
+    Return the address of the first seed with maximum fitness.
+    """
+    return int(np.argmax(self.row_sums))
+  #
+  # worst_address(self) -- returns address
+  #
+  def worst_address(self):
+    """
+    Return the address of the first seed with minimum fitness.
+    """
+    return int(np.argmin(self.row_sums))
+  #
+  # top_addresses(self, sample_size) -- returns list of addresses
+  #
+  def top_addresses(self, sample_size):
+    """
+    Return the addresses of the sample_size fittest seeds, in order
+    of decreasing fitness, with ties in order of address.
+    """
+    order = np.argsort(- self.row_sums, kind="stable")
+    return [int(i) for i in order[0:sample_size]]
+  #
+"""
+Make a class for Golly sessions.
+"""
+#
+# Setting up a new Golly universe for every trial (g.setalgo(), g.new(),
+# g.setrule()) makes Golly parse the rule and rebuild the universe
+# each time. A session keeps one Golly layer for each torus size that
+# has been used recently, already set up with the right rule, and
+# only clears the cells between trials.
+#
+class GollySession:
+  """
+  A class for reusing Golly layers across contests.
+  """
+  #
+  # __init__(self, rule_name, max_layers) -- returns NULL
+  #
+  def __init__(self, rule_name, max_layers):
+    """
+    Make a session for the given rule that uses at most max_layers
+    Golly layers, starting with the current layer.
+    """
+    self.rule_name = rule_name
+    self.max_layers = max_layers
+    # [layer, g_width, g_height, algo] for each layer in the session,
+    # least recently used first
+    self.layers = []
+  #
+  # prepare(self, g, g_width, g_height, algo) -- returns NULL
+  #
+  def prepare(self, g, g_width, g_height, algo):
+    """
+    Make the current Golly layer an empty toroid of width g_width
+    and height g_height, run by the Golly algorithm algo. If a layer
+    already has a toroid of this size, clear it and reuse it;
+    otherwise use a new layer or, when there are already max_layers
+    layers, the least recently used one.
+    """
+    rule = self.rule_name + ":T" + str(g_width) + "," + str(g_height)
+    for entry in self.layers:
+      if (entry[1:3] == [g_width, g_height]):
+        # move the layer to the end of the list (most recently used)
+        self.layers.remove(entry)
+        self.layers.append(entry)
+        g.setlayer(entry[0])
+        # another script may have changed the rule in this layer
+        if (g.getrule() == rule):
+          g.select([- int(g_width / 2), - int(g_height / 2), \
+            g_width, g_height])
+          g.clear(0) # clear the cells inside the selection
+          g.select([])
+          if (entry[3] != algo):
+            g.setalgo(algo)
+            entry[3] = algo
+        else:
+          self.setup(g, rule, algo)
+          entry[3] = algo
+        return
+    if (len(self.layers) == 0):
+      layer = g.getlayer() # start with the current layer
+    elif ((len(self.layers) < self.max_layers) and \
+      (g.numlayers() < g.maxlayers())):
+      layer = g.addlayer() # the new layer becomes current
+    else:
+      layer = self.layers.pop(0)[0] # the least recently used layer
+      g.setlayer(layer)
+    self.layers.append([layer, g_width, g_height, algo])
+    self.setup(g, rule, algo)
+  #
+  # setup(self, g, rule, algo) -- returns NULL
+  #
+  def setup(self, g, rule, algo):
+    """
+    Set up the current Golly layer from scratch with the given rule
+    and algorithm.
+    """
+    g.setalgo(algo) # "HashLife" or "QuickLife"
+    g.autoupdate(False) # do not update the view unless requested
+    g.new(self.rule_name) # initialize cells to state 0
+    g.setrule(rule) # make a toroid
+  #
+#
 #
 #
 #
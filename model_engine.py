@@ -0,0 +1,958 @@
+"""
+Model Engine
+
+NumPy engines for running the Management Game on a toroid,
+without calling Golly one cell at a time.
+"""
+import numpy as np
+import itertools
+import os
+from concurrent.futures import ThreadPoolExecutor
+"""
+Functions for stepping the Management Game with NumPy
+"""
+#
+# Note: the grids here follow the same convention as the seeds in
+# model_classes.py. A grid is indexed as grid[x][y], where x is the
+# horizontal Golly coordinate and y is the vertical Golly coordinate.
+# A toroid of Golly width g_width and Golly height g_height is stored
+# as an array of shape (g_width, g_height). The Management Game has
+# six states:
+#
+# 0 = dead                       = white
+# 1 = player 1 alone             = red
+# 2 = player 2 alone             = blue
+# 3 = player 1 with interaction  = orange (red + yellow)
+# 4 = player 2 with interaction  = green (blue + yellow)
+# 5 = border marker              = purple
+#
+num_states = 6
+#
+# neighbour_sum(layer) -- returns counts
+#
+def neighbour_sum(layer):
+  """
+  Given a layer of zeros and ones, count the ones in the Moore
+  neighbourhood (the eight surrounding cells) of every cell. The
+  last two axes of the layer are treated as a toroid; any leading
+  axes are treated as a batch of independent toroids.
+  """
+  # sum each cell with its left and right neighbours
+  row_sum = layer + np.roll(layer, 1, axis=-2) + np.roll(layer, -1, axis=-2)
+  # sum each row_sum with the row_sums above and below
+  box_sum = row_sum + np.roll(row_sum, 1, axis=-1) + \
+    np.roll(row_sum, -1, axis=-1)
+  # the centre cell is not part of its own neighbourhood
+  return box_sum - layer
+#
+# management_step(grid) -- returns new_grid
+#
+def management_step(grid):
+  """
+  Apply one step of the Management Game (Management.rule) to
+  every cell of the given toroidal grid. The rule is the Game of
+  Life (B3/S23) with colours: survivors keep their colour, and
+  newborn cells take their colour from their three parents.
+  """
+  red = (grid == 1).astype(np.uint8)
+  blue = (grid == 2).astype(np.uint8)
+  orange = (grid == 3).astype(np.uint8)
+  green = (grid == 4).astype(np.uint8)
+  # count the neighbours of each kind
+  num_red = neighbour_sum(red)
+  num_blue = neighbour_sum(blue)
+  num_side1 = num_red + neighbour_sum(orange) # red or orange
+  num_live = num_side1 + num_blue + neighbour_sum(green)
+  return management_rule(grid, num_red, num_blue, num_side1, num_live)
+#
+# management_rule(grid, num_red, num_blue, num_side1, num_live)
+# -- returns new_grid
+#
+def management_rule(grid, num_red, num_blue, num_side1, num_live):
+  """
+  Given a grid and the counts of red, blue, red/orange, and live
+  neighbours of every cell, apply the Management Game (see
+  management_step()) to find the new state of every cell.
+  """
+  # live cells are red, blue, orange, or green; white and purple
+  # are both dead
+  alive = (grid >= 1) & (grid <= 4)
+  # survival with two or three live neighbours -- survivors keep
+  # their colour; everything else becomes white, including purple
+  survive = alive & ((num_live == 2) | (num_live == 3))
+  new_grid = np.where(survive, grid, np.uint8(0))
+  # birth with three live neighbours, checked in the order given
+  # in Management.rule:
+  #
+  # - 3 red -> red birth
+  # - 3 blue -> blue birth
+  # - 2 red/orange + 1 non-red -> orange birth
+  # - 2 blue/green + 1 non-blue -> green birth
+  #
+  birth = (~ alive) & (num_live == 3)
+  birth_colour = np.where(num_red == 3, np.uint8(1), \
+    np.where(num_blue == 3, np.uint8(2), \
+    np.where(num_side1 >= 2, np.uint8(3), np.uint8(4))))
+  new_grid[birth] = birth_colour[birth]
+  #
+  return new_grid
+#
+# run_management(grid, num_steps) -- returns new_grid
+#
+def run_management(grid, num_steps):
+  """
+  Run the Management Game on the given toroidal grid for
+  num_steps steps.
+  """
+  for step in range(num_steps):
+    grid = management_step(grid)
+  return grid
+#
+# Tiled engine
+#
+# Late in a contest, most of the toroid is empty or frozen in still
+# lifes. The tiled engine splits the toroid into square tiles of
+# tile_size x tile_size cells and remembers which tiles changed on
+# the last step. A cell can only change if some cell in its Moore
+# neighbourhood changed, so on the next step we only need to
+# recompute the tiles that changed and the eight tiles around them.
+# When the toroid is not a multiple of tile_size, the last row and
+# column of tiles overlap their neighbours, which is harmless, since
+# every tile is computed from the same old grid.
+#
+tile_size = 8
+#
+# halo_sum(layer) -- returns counts
+#
+def halo_sum(layer):
+  """
+  Given a layer of zeros and ones whose last two axes include a
+  border (halo) of one cell on each side, count the ones in the
+  Moore neighbourhood of every cell inside the border.
+  """
+  row_sum = layer[..., :-2, :] + layer[..., 1:-1, :] + layer[..., 2:, :]
+  box_sum = row_sum[..., :-2] + row_sum[..., 1:-1] + row_sum[..., 2:]
+  return box_sum - layer[..., 1:-1, 1:-1]
+#
+# tile_indices(length, size) -- returns [inner, outer]
+#
+def tile_indices(length, size):
+  """
+  Split one axis of a toroid of the given length into tiles of the
+  given size. Returns two arrays: inner[i] holds the coordinates of
+  the cells in tile i, and outer[i] holds the same coordinates plus
+  one cell on each side, wrapping around the edges of the toroid.
+  """
+  size = min(size, length)
+  num_tiles = (length + size - 1) // size
+  starts = np.minimum(np.arange(num_tiles) * size, length - size)
+  inner = starts[:, np.newaxis] + np.arange(size)
+  outer = (starts[:, np.newaxis] + np.arange(-1, size + 1)) % length
+  return [inner, outer]
+#
+# flat_tiles(x_index, y_index, g_height) -- returns flat_index
+#
+def flat_tiles(x_index, y_index, g_height):
+  """
+  Combine the coordinates of the tiles along x and along y into
+  indices into the flattened grid, with one row for each tile, in
+  the same order as the tiles in grow_tiles().
+  """
+  flat = x_index[:, np.newaxis, :, np.newaxis] * g_height + \
+    y_index[np.newaxis, :, np.newaxis, :]
+  return flat.reshape((len(x_index) * len(y_index), -1))
+#
+# grow_tiles(changed) -- returns active
+#
+def grow_tiles(changed):
+  """
+  Given a boolean array marking the tiles that changed, mark each
+  tile that changed and the eight tiles around it, wrapping around
+  the edges of the toroid.
+  """
+  row_any = changed | np.roll(changed, 1, axis=0) | \
+    np.roll(changed, -1, axis=0)
+  return row_any | np.roll(row_any, 1, axis=1) | np.roll(row_any, -1, axis=1)
+#
+# run_tiled(grid, num_steps) -- returns new_grid
+#
+def run_tiled(grid, num_steps):
+  """
+  Run the Management Game on the given toroidal grid for num_steps
+  steps, recomputing only the tiles near recent changes. The result
+  is the same as run_management().
+  """
+  if (grid.ndim > 2):
+    # the tiles that are active differ from one toroid to the next,
+    # so run the toroids in a batch one at a time
+    (g_width, g_height) = grid.shape[-2:]
+    grids = grid.reshape((-1, g_width, g_height))
+    new_grids = np.empty_like(grids)
+    for k in range(grids.shape[0]):
+      new_grids[k] = run_tiled(grids[k], num_steps)
+    return new_grids.reshape(grid.shape)
+  #
+  (g_width, g_height) = grid.shape
+  [x_inner, x_outer] = tile_indices(g_width, tile_size)
+  [y_inner, y_outer] = tile_indices(g_height, tile_size)
+  inner = flat_tiles(x_inner, y_inner, g_height)
+  outer = flat_tiles(x_outer, y_outer, g_height)
+  block_shape = (x_outer.shape[1], y_outer.shape[1])
+  cells = grid.ravel().copy()
+  # at first, every tile counts as changed
+  changed = np.ones((len(x_inner), len(y_inner)), dtype=bool)
+  for step in range(num_steps):
+    active = np.flatnonzero(grow_tiles(changed))
+    if (len(active) == 0):
+      # nothing changed on the last step, so nothing ever will
+      break
+    # gather the active tiles with their borders and step them
+    blocks = cells[outer[active]].reshape((len(active),) + block_shape)
+    centre = blocks[:, 1:-1, 1:-1]
+    num_red = halo_sum((blocks == 1).astype(np.uint8))
+    num_blue = halo_sum((blocks == 2).astype(np.uint8))
+    num_side1 = num_red + halo_sum((blocks == 3).astype(np.uint8))
+    num_live = num_side1 + num_blue + halo_sum((blocks == 4).astype(np.uint8))
+    new_tiles = management_rule(centre, num_red, num_blue, num_side1, \
+      num_live)
+    # write the tiles back and note which ones changed
+    cells[inner[active]] = new_tiles.reshape((len(active), -1))
+    changed[:, :] = False
+    changed.ravel()[active] = (new_tiles != centre).any(axis=(1, 2))
+  return cells.reshape(grid.shape)
+#
+# Threaded engine
+#
+# For the largest toroids, a single contest can be split across
+# several cores. The threaded engine cuts the toroid into horizontal
+# strips (ranges of y) and steps each strip in its own thread, with
+# a halo of one row above and one row below, copied from the old
+# grid with wrap-around. NumPy releases the GIL inside its array
+# operations, so the strips run in parallel. The threads meet once
+# per step, when all the strips of the new grid have been written.
+#
+num_threads = os.cpu_count() or 1
+#
+# The pool of num_threads threads, made on the first call to
+# run_threaded() and shared by all later calls, so that the threads
+# are not started again for every chunk of every contest.
+#
+thread_pool = None
+#
+# strip_step(grid, new_grid, y_start, y_end) -- returns NULL
+#
+def strip_step(grid, new_grid, y_start, y_end):
+  """
+  Step the rows y_start to y_end - 1 of the given toroidal grid (with
+  optional leading batch axes) and write them into new_grid.
+  """
+  g_height = grid.shape[-1]
+  rows = np.arange(y_start - 1, y_end + 1) % g_height
+  block = grid[..., rows]
+  # wrap around in x, but use the halo rows in y
+  def block_sum(layer):
+    row_sum = layer + np.roll(layer, 1, axis=-2) + np.roll(layer, -1, axis=-2)
+    box_sum = row_sum[..., :-2] + row_sum[..., 1:-1] + row_sum[..., 2:]
+    return box_sum - layer[..., 1:-1]
+  num_red = block_sum((block == 1).astype(np.uint8))
+  num_blue = block_sum((block == 2).astype(np.uint8))
+  num_side1 = num_red + block_sum((block == 3).astype(np.uint8))
+  num_live = num_side1 + num_blue + block_sum((block == 4).astype(np.uint8))
+  new_grid[..., y_start:y_end] = management_rule(block[..., 1:-1], \
+    num_red, num_blue, num_side1, num_live)
+#
+# run_threaded(grid, num_steps) -- returns new_grid
+#
+def run_threaded(grid, num_steps):
+  """
+  Run the Management Game on the given toroidal grid for num_steps
+  steps, stepping horizontal strips of the grid in num_threads
+  threads. The result is the same as run_management().
+  """
+  g_height = grid.shape[-1]
+  num_strips = min(num_threads, g_height)
+  if (num_strips <= 1):
+    return run_management(grid, num_steps)
+  bounds = [(g_height * k) // num_strips for k in range(num_strips + 1)]
+  # the two grids take turns as the old grid and the new grid
+  grid = grid.copy()
+  new_grid = np.empty_like(grid)
+  global thread_pool
+  if (thread_pool == None):
+    thread_pool = ThreadPoolExecutor(max_workers=num_threads)
+  for step in range(num_steps):
+    jobs = [thread_pool.submit(strip_step, grid, new_grid, bounds[k], \
+      bounds[k + 1]) for k in range(num_strips)]
+    for job in jobs:
+      job.result() # wait for the strip (and pass on any error)
+    [grid, new_grid] = [new_grid, grid]
+  return grid
+#
+# Bit-sliced engine
+#
+# The six states of the Management Game fit in three bitplanes:
+#
+#   state            alive   side   interaction
+#   0 = white          0       0        0
+#   1 = red            1       1        0
+#   2 = blue           1       0        0
+#   3 = orange         1       1        1
+#   4 = green          1       0        1
+#   5 = purple         0       0        1
+#
+# Each bitplane is packed along the y axis (the last axis of the grid)
+# into 64-bit words, so that each bitwise operation updates 64 cells.
+# The neighbour counts are computed with bitwise adder networks. Bits
+# beyond the height of the toroid, in the last word of each column,
+# are always kept at zero.
+#
+word_size = 64
+one = np.uint64(1)
+#
+# pack_bits(layer) -- returns words
+#
+def pack_bits(layer):
+  """
+  Pack a boolean layer of shape (..., g_width, g_height) into 64-bit
+  words of shape (..., g_width, num_words), along the last axis.
+  """
+  g_height = layer.shape[-1]
+  num_words = (g_height + word_size - 1) // word_size
+  padding = [(0, 0)] * (layer.ndim - 1) + \
+    [(0, (num_words * word_size) - g_height)]
+  padded = np.pad(layer.astype(np.uint8), padding)
+  packed = np.packbits(padded, axis=-1, bitorder="little")
+  return np.ascontiguousarray(packed).view("<u8")
+#
+# unpack_bits(words, g_height) -- returns layer
+#
+def unpack_bits(words, g_height):
+  """
+  Unpack 64-bit words of shape (..., g_width, num_words) into a
+  boolean layer of shape (..., g_width, g_height).
+  """
+  packed = np.ascontiguousarray(words.astype("<u8")).view(np.uint8)
+  layer = np.unpackbits(packed, axis=-1, count=g_height, bitorder="little")
+  return layer.astype(bool)
+#
+# pack_planes(grid) -- returns [alive, side, interaction]
+#
+def pack_planes(grid):
+  """
+  Convert a grid of states into three packed bitplanes.
+  """
+  alive = pack_bits((grid >= 1) & (grid <= 4))
+  side = pack_bits((grid == 1) | (grid == 3))
+  interaction = pack_bits((grid == 3) | (grid == 4) | (grid == 5))
+  return [alive, side, interaction]
+#
+# unpack_planes(planes, g_height) -- returns grid
+#
+def unpack_planes(planes, g_height):
+  """
+  Convert three packed bitplanes back into a grid of states.
+  """
+  [alive, side, interaction] = planes
+  a = unpack_bits(alive, g_height)
+  s = unpack_bits(side, g_height)
+  i = unpack_bits(interaction, g_height)
+  grid = np.zeros(a.shape, dtype=np.uint8)
+  grid[a & s & ~ i] = 1
+  grid[a & ~ s & ~ i] = 2
+  grid[a & s & i] = 3
+  grid[a & ~ s & i] = 4
+  grid[~ a & i] = 5
+  return grid
+#
+# shift_bits(words, g_height, direction) -- returns shifted
+#
+def shift_bits(words, g_height, direction):
+  """
+  Shift packed words by one cell along the y axis, wrapping around
+  the toroid. With direction = +1, the cell at y receives the cell
+  at y - 1; with direction = -1, the cell at y receives the cell
+  at y + 1.
+  """
+  last_word = (g_height - 1) // word_size
+  last_bit = np.uint64((g_height - 1) % word_size)
+  top = np.uint64(word_size - 1)
+  if (direction == 1):
+    # carry the top bit of each word into the bottom of the next word
+    shifted = (words << one) | (np.roll(words, 1, axis=-1) >> top)
+    # the cell at y = 0 receives the cell at y = g_height - 1
+    wrap = (words[..., last_word] >> last_bit) & one
+    shifted[..., 0] = (shifted[..., 0] & ~ one) | wrap
+  else:
+    # carry the bottom bit of each word into the top of the previous word
+    shifted = (words >> one) | (np.roll(words, -1, axis=-1) << top)
+    # the cell at y = g_height - 1 receives the cell at y = 0
+    wrap = (words[..., 0] & one) << last_bit
+    shifted[..., last_word] = (shifted[..., last_word] & ~ (one << last_bit)) \
+      | wrap
+  # keep the bits beyond g_height at zero
+  if ((g_height % word_size) != 0):
+    mask = (one << np.uint64(g_height % word_size)) - one
+    shifted[..., last_word] &= mask
+  return shifted
+#
+# neighbour_words(words, g_height) -- returns a list of eight neighbours
+#
+def neighbour_words(words, g_height):
+  """
+  Make the eight shifted copies of the packed words that bring each
+  cell of the Moore neighbourhood to the position of the centre cell.
+  """
+  up = shift_bits(words, g_height, 1)
+  down = shift_bits(words, g_height, -1)
+  neighbours = [up, down]
+  for column in [words, up, down]:
+    neighbours.append(np.roll(column, 1, axis=-2))
+    neighbours.append(np.roll(column, -1, axis=-2))
+  return neighbours
+#
+# count_words(inputs, num_bits) -- returns a list of count bits
+#
+def count_words(inputs, num_bits):
+  """
+  Count the ones in a list of packed inputs, cell by cell, with a
+  bitwise ripple-carry adder. The count is returned as num_bits
+  bitplanes, least significant first, so it is the count modulo
+  2 to the power of num_bits.
+  """
+  bits = [np.zeros_like(inputs[0]) for k in range(num_bits)]
+  for carry in inputs:
+    for k in range(num_bits):
+      (bits[k], carry) = (bits[k] ^ carry, bits[k] & carry)
+  return bits
+#
+# bitplane_step(planes, g_height) -- returns new_planes
+#
+def bitplane_step(planes, g_height):
+  """
+  Apply one step of the Management Game to packed bitplanes. This
+  gives the same result as management_step().
+  """
+  [alive, side, interaction] = planes
+  red = alive & side & ~ interaction
+  blue = alive & ~ side & ~ interaction
+  side1 = alive & side # red or orange
+  # A count of live neighbours modulo 8 is enough to find counts of
+  # 2 and 3, since 8 is the only count that wraps around. For births,
+  # the counts of red, blue, and red/orange neighbours are at most 3,
+  # so counts modulo 4 are enough.
+  [live0, live1, live2] = count_words(neighbour_words(alive, g_height), 3)
+  [red0, red1] = count_words(neighbour_words(red, g_height), 2)
+  [blue0, blue1] = count_words(neighbour_words(blue, g_height), 2)
+  [side0, side1] = count_words(neighbour_words(side1, g_height), 2)
+  live2or3 = live1 & ~ live2
+  live3 = live2or3 & live0
+  survive = alive & live2or3
+  birth = ~ alive & live3
+  # newborn colours:
+  # - 3 red -> red (side 1, no interaction)
+  # - 3 blue -> blue (side 0, no interaction)
+  # - 2 or 3 red/orange -> orange (side 1, interaction)
+  # - otherwise -> green (side 0, interaction)
+  red3 = red0 & red1
+  blue3 = blue0 & blue1
+  new_alive = survive | birth
+  new_side = (survive & side) | (birth & side1)
+  new_interaction = (survive & interaction) | (birth & ~ (red3 | blue3))
+  return [new_alive, new_side, new_interaction]
+#
+# run_bitplane(grid, num_steps) -- returns new_grid
+#
+def run_bitplane(grid, num_steps):
+  """
+  Run the Management Game on the given toroidal grid for num_steps
+  steps, using the bit-sliced engine. The grid may have leading
+  batch axes, as with run_management().
+  """
+  g_height = grid.shape[-1]
+  planes = pack_planes(grid)
+  for step in range(num_steps):
+    planes = bitplane_step(planes, g_height)
+  return unpack_planes(planes, g_height)
+#
+# Rule tables
+#
+# Golly rule files (*.rule) give the transitions of a rule in an
+# @TABLE section. With "symmetries:permute", the order of the eight
+# neighbours does not matter, so a transition depends only on the
+# state of the centre cell and on the number of neighbours in each
+# state. We compile the table into a dense lookup table, indexed by
+# [centre state][key], where the key encodes the neighbour counts:
+#
+#   key = sum over states s >= 1 of (count of state s) * 9^(s - 1)
+#
+# The count of state 0 is implied, since there are eight neighbours.
+# A whole grid can then be stepped with one fancy-indexing operation.
+#
+rule_tables = {} # maps rule names to compiled lookup tables
+#
+# read_rule_table(rule_path) -- returns [num_states, variables, transitions]
+#
+def read_rule_table(rule_path):
+  """
+  Read the @TABLE section of a Golly rule file. Each variable maps
+  to a list of states. Each transition is a list of ten tokens: the
+  centre, the eight neighbours, and the new state, where each token
+  is either a state number or a variable name.
+  """
+  num_states = 0
+  neighbourhood = ""
+  symmetries = ""
+  variables = {}
+  transitions = []
+  in_table = False
+  for line in open(rule_path):
+    # strip comments and white space
+    line = line.split("#")[0].strip()
+    if (line == ""):
+      continue
+    # sections begin with "@"
+    if line.startswith("@"):
+      in_table = line.startswith("@TABLE")
+      continue
+    if (not in_table):
+      continue
+    if line.startswith("n_states:"):
+      num_states = int(line.split(":")[1])
+    elif line.startswith("neighborhood:"):
+      neighbourhood = line.split(":")[1].strip()
+    elif line.startswith("symmetries:"):
+      symmetries = line.split(":")[1].strip()
+    elif line.startswith("var "):
+      [name, values] = line[4:].split("=")
+      states = []
+      for value in values.strip().strip("{}").split(","):
+        value = value.strip()
+        if value in variables:
+          states.extend(variables[value])
+        else:
+          states.append(int(value))
+      variables[name.strip()] = states
+    elif ("," in line):
+      transitions.append([token.strip() for token in line.split(",")])
+    else:
+      # compact form for rules with ten or fewer states: "0123456780"
+      transitions.append(list(line.replace(" ", "")))
+  #
+  assert num_states > 0
+  assert neighbourhood == "Moore"
+  assert symmetries == "permute"
+  for transition in transitions:
+    assert len(transition) == 10
+  #
+  return [num_states, variables, transitions]
+#
+# match_neighbours(counts, slot_sets) -- returns True or False
+#
+def match_neighbours(counts, slot_sets):
+  """
+  Decide whether the neighbours, given as a count of each state, can
+  be assigned to the eight slots of a permute transition, where each
+  slot accepts a set of states. This is a bipartite matching between
+  neighbours and slots, found with augmenting paths.
+  """
+  neighbours = []
+  for state in range(len(counts)):
+    neighbours.extend([state] * counts[state])
+  slot_owner = [-1] * len(slot_sets)
+  #
+  def augment(n, visited):
+    for slot in range(len(slot_sets)):
+      if ((neighbours[n] in slot_sets[slot]) and (slot not in visited)):
+        visited.add(slot)
+        if ((slot_owner[slot] == -1) or augment(slot_owner[slot], visited)):
+          slot_owner[slot] = n
+          return True
+    return False
+  #
+  for n in range(len(neighbours)):
+    if (not augment(n, set())):
+      return False
+  return True
+#
+# compile_rule_table(rule_path) -- returns table
+#
+def compile_rule_table(rule_path):
+  """
+  Compile a Golly rule file with permute symmetry into a dense lookup
+  table (see above). Transitions are checked in the order given and
+  the first match is applied; if no transition matches, the centre
+  cell keeps its state, as in Golly.
+  """
+  [num_states, variables, transitions] = read_rule_table(rule_path)
+  num_keys = 9 ** (num_states - 1)
+  table = np.zeros((num_states, num_keys), dtype=np.uint8)
+  #
+  def states_of(token, binding):
+    if token in binding:
+      return [binding[token]]
+    if token in variables:
+      return variables[token]
+    return [int(token)]
+  #
+  # A variable that appears more than once in a transition must take
+  # the same value each time it appears, so we bind such variables
+  # before matching the neighbours.
+  #
+  prepared = []
+  for transition in transitions:
+    inputs = transition[0:9]
+    bound = sorted(set([token for token in inputs \
+      if ((token in variables) and (inputs.count(token) > 1))]))
+    prepared.append([transition, bound])
+  #
+  # All the ways to distribute eight neighbours among the states.
+  #
+  all_counts = []
+  for counts in itertools.product(range(9), repeat=num_states - 1):
+    if (sum(counts) <= 8):
+      all_counts.append([8 - sum(counts)] + list(counts))
+  #
+  for centre in range(num_states):
+    # keys that cannot occur keep the centre state
+    table[centre, :] = centre
+    for counts in all_counts:
+      key = 0
+      for state in range(1, num_states):
+        key += counts[state] * (9 ** (state - 1))
+      new_state = centre
+      for [transition, bound] in prepared:
+        found = False
+        for values in itertools.product(*[variables[name] \
+          for name in bound]):
+          binding = dict(zip(bound, values))
+          if (centre not in states_of(transition[0], binding)):
+            continue
+          # the centre binds its own variable, for the output
+          if (transition[0] in variables):
+            binding[transition[0]] = centre
+          slot_sets = [states_of(token, binding) \
+            for token in transition[1:9]]
+          if match_neighbours(counts, slot_sets):
+            output = transition[9]
+            assert (output in binding) or (output not in variables)
+            new_state = states_of(output, binding)[0]
+            found = True
+            break
+        if found:
+          break
+      table[centre, key] = new_state
+  #
+  return table
+#
+# load_rule_table(rule_name) -- returns table
+#
+def load_rule_table(rule_name):
+  """
+  Load the compiled lookup table for the named rule (for example,
+  "Management" or "Immigration"), compiling the file rule_name.rule
+  in the Model-S directory the first time it is needed.
+  """
+  if (rule_name not in rule_tables):
+    rule_dir = os.path.dirname(os.path.abspath(__file__))
+    rule_path = os.path.join(rule_dir, rule_name + ".rule")
+    rule_tables[rule_name] = compile_rule_table(rule_path)
+  return rule_tables[rule_name]
+#
+# table_step(grid, table) -- returns new_grid
+#
+def table_step(grid, table):
+  """
+  Apply one step of a compiled rule table to every cell of the given
+  toroidal grid (with optional leading batch axes).
+  """
+  num_states = table.shape[0]
+  key = np.zeros(grid.shape, dtype=np.int32)
+  for state in range(1, num_states):
+    layer = (grid == state).astype(np.uint8)
+    key += neighbour_sum(layer).astype(np.int32) * (9 ** (state - 1))
+  return table[grid, key]
+#
+# run_table(grid, num_steps) -- returns new_grid
+#
+def run_table(grid, num_steps):
+  """
+  Run the Management Game on the given toroidal grid for num_steps
+  steps, using the lookup table compiled from Management.rule.
+  """
+  table = load_rule_table("Management")
+  for step in range(num_steps):
+    grid = table_step(grid, table)
+  return grid
+#
+# Plane engine
+#
+# The analysis functions run seeds on Golly's infinite plane. Here
+# the plane is stored as a grid that holds every cell that is not
+# white, with a border of white cells around it. Since signals move
+# at most one cell per step, the cells outside the grid stay white,
+# and as long as the outermost rows and columns of the grid are
+# white, the wrap-around in neighbour_sum() does no harm. When the
+# pattern reaches the border, the grid is cropped to the pattern and
+# padded with plane_margin white cells on each side.
+#
+plane_margin = 16
+#
+# life_step(grid) -- returns new_grid
+#
+def life_step(grid):
+  """
+  Apply one step of the Game of Life (B3/S23) to a grid of zeros
+  and ones.
+  """
+  num_live = neighbour_sum(grid)
+  return ((num_live == 3) | ((grid == 1) & (num_live == 2))).astype(np.uint8)
+#
+# Rules for the plane engine.
+#
+plane_rules = {
+  "Life": life_step,
+  "Management": management_step,
+}
+#
+# make_plane(cells) -- returns grid
+#
+def make_plane(cells):
+  """
+  Copy a matrix of states, indexed as cells[x][y], into a grid for
+  the plane engine, with plane_margin white cells on each side.
+  """
+  grid = np.pad(np.asarray(cells, dtype=np.uint8), plane_margin)
+  return grid
+#
+# recentre_plane(grid) -- returns grid
+#
+def recentre_plane(grid):
+  """
+  Crop the grid to the cells that are not white and pad it with
+  plane_margin white cells on each side.
+  """
+  xs = np.flatnonzero(grid.any(axis=1))
+  ys = np.flatnonzero(grid.any(axis=0))
+  if (len(xs) == 0):
+    return np.zeros((2 * plane_margin, 2 * plane_margin), dtype=np.uint8)
+  pattern = grid[xs[0]:(xs[-1] + 1), ys[0]:(ys[-1] + 1)]
+  return np.pad(pattern, plane_margin)
+#
+# run_plane(grid, num_steps, rule_name) -- returns new_grid
+#
+def run_plane(grid, num_steps, rule_name):
+  """
+  Run the given rule ("Life" or "Management") for num_steps steps on
+  an infinite plane, starting from a grid made by make_plane(), and
+  return the new grid. The grid grows as the pattern grows.
+  """
+  step = plane_rules[rule_name]
+  for k in range(num_steps):
+    if (grid[0, :].any() or grid[-1, :].any() or \
+      grid[:, 0].any() or grid[:, -1].any()):
+      grid = recentre_plane(grid)
+    grid = step(grid)
+  return grid
+#
+# plane_counts(grid) -- returns [white, red, blue, orange, green, purple]
+#
+def plane_counts(grid):
+  """
+  Count the number of cells in each state, except white, which is
+  unbounded on the infinite plane and is reported as zero, like the
+  counts from g.getcells() in Golly. For the Game of Life, the count
+  of live cells is in position 1.
+  """
+  counts = np.bincount(grid.ravel(), minlength=num_states)
+  return [0] + [int(count) for count in counts[1:]]
+#
+# trace_plane(grid, num_steps, interval, rule_name) -- returns trace
+#
+def trace_plane(grid, num_steps, interval, rule_name):
+  """
+  Run the given rule on an infinite plane for num_steps steps, as in
+  run_plane(), and count the cells in each state every interval steps.
+  Returns an array trace[k][state] with the counts (as in
+  plane_counts()) after k * interval steps, for k from 0 to
+  num_steps / interval.
+  """
+  assert num_steps % interval == 0
+  trace = np.zeros((num_steps // interval + 1, num_states), dtype=np.int64)
+  trace[0] = plane_counts(grid)
+  for k in range(1, len(trace)):
+    grid = run_plane(grid, interval, rule_name)
+    trace[k] = plane_counts(grid)
+  return trace
+#
+# Engines for running the Management Game on a toroid. Each engine
+# takes a grid (with optional leading batch axes) and a number of
+# steps, and returns the new grid.
+#
+torus_engines = {
+  "numpy": run_management,
+  "bitplane": run_bitplane,
+  "table": run_table,
+  "tiled": run_tiled,
+  "threaded": run_threaded,
+}
+#
+# run_torus(grid, num_steps, engine) -- returns new_grid
+#
+def run_torus(grid, num_steps, engine):
+  """
+  Run the Management Game on the given toroidal grid for num_steps
+  steps, with the named engine (see torus_engines).
+  """
+  return torus_engines[engine](grid, num_steps)
+#
+# count_grid_colours(grid) -- returns [red, blue, orange, green]
+#
+def count_grid_colours(grid):
+  """
+  Count the number of cells for each of the colours. We only
+  care about red, blue, orange, and green. This matches
+  count_colours() in model_functions.py.
+  """
+  counts = np.bincount(grid.ravel(), minlength=num_states)
+  return [int(counts[1]), int(counts[2]), int(counts[3]), int(counts[4])]
+#
+# place_seeds(grid, cells1, x1, y1, cells2, x2, y2) -- returns NULL
+#
+def place_seeds(grid, cells1, x1, y1, cells2, x2, y2):
+  """
+  Write the seed arrays cells1 and cells2 into the given toroidal
+  grid with their corners at (x1, y1) and (x2, y2). The corners are
+  given relative to the corner of the toroid, so they range from 0
+  to g_width - 1 and from 0 to g_height - 1.
+  """
+  (xspan1, yspan1) = cells1.shape
+  (xspan2, yspan2) = cells2.shape
+  grid[x1:(x1 + xspan1), y1:(y1 + yspan1)] = cells1
+  grid[x2:(x2 + xspan2), y2:(y2 + yspan2)] = cells2
+#
+# run_torus_cycles(grids, num_steps, engine, cycle_interval)
+# -- returns new_grids
+#
+def run_torus_cycles(grids, num_steps, engine, cycle_interval):
+  """
+  Run the Management Game on a stack of toroidal grids for num_steps
+  steps, checking every cycle_interval steps whether a grid has
+  returned to an earlier state. A toroid has a finite number of
+  states, so it always falls into a cycle sooner or later; still
+  lifes are cycles of period one. When a grid repeats the state it
+  had p steps earlier, its state after num_steps steps is the same
+  as its state after (num_steps - time) mod p more steps, so we
+  finish it directly and drop it from the stack. Only a hash of each
+  earlier state is kept, so a repeated hash is confirmed by running
+  the grid p more steps and comparing it byte for byte with its
+  present state; the result is exactly the same as running the full
+  num_steps steps.
+  """
+  assert cycle_interval > 0
+  final = np.empty_like(grids)
+  active = list(range(grids.shape[0]))
+  seen = [{hash(grids[k].tobytes()): 0} for k in active]
+  time = 0
+  while (time < num_steps) and (len(active) > 0):
+    chunk = min(cycle_interval, num_steps - time)
+    grids = run_torus(grids, chunk, engine)
+    time += chunk
+    if (time == num_steps):
+      break
+    running = []
+    for (j, k) in enumerate(active):
+      key = hash(grids[j].tobytes())
+      if key in seen[k]:
+        period = time - seen[k][key]
+        if (period >= num_steps - time):
+          # confirming the cycle would cost as much as finishing
+          final[k] = run_torus(grids[j], num_steps - time, engine)
+          continue
+        if np.array_equal(run_torus(grids[j], period, engine), grids[j]):
+          remaining = (num_steps - time) % period
+          final[k] = run_torus(grids[j], remaining, engine)
+          continue
+      # a new state, or a hash collision
+      seen[k][key] = time
+      running.append(j)
+    if (len(running) < len(active)):
+      grids = grids[running]
+      active = [active[j] for j in running]
+  final[active] = grids
+  return final
+#
+# torus_contest(cells1, x1, y1, cells2, x2, y2, g_width, g_height, \
+#   g_time, engine, cycle_interval) -- returns [red, blue, orange, green]
+#
+def torus_contest(cells1, x1, y1, cells2, x2, y2, g_width, g_height, \
+  g_time, engine, cycle_interval):
+  """
+  Make a toroid of width g_width and height g_height, write the
+  seed arrays cells1 and cells2 into the toroid with their corners
+  at (x1, y1) and (x2, y2), run the Management Game for g_time steps
+  with the named engine, and count the final colours. If
+  cycle_interval is positive, stop early when the toroid falls into
+  a cycle (see run_torus_cycles()).
+  """
+  return torus_contest_horizons(cells1, x1, y1, cells2, x2, y2, \
+    g_width, g_height, [g_time], engine, cycle_interval)[0]
+#
+# torus_contest_horizons(cells1, x1, y1, cells2, x2, y2, g_width, \
+#   g_height, horizon_times, engine, cycle_interval)
+# -- returns a list of [red, blue, orange, green], one for each horizon
+#
+def torus_contest_horizons(cells1, x1, y1, cells2, x2, y2, g_width, \
+  g_height, horizon_times, engine, cycle_interval):
+  """
+  Like torus_contest(), but count the colours at each of the times
+  in horizon_times (in ascending order), during one run of the
+  toroid. The counts at each time are the same as the counts from
+  torus_contest() with g_time set to that time.
+  """
+  grid = np.zeros((g_width, g_height), dtype=np.uint8)
+  place_seeds(grid, cells1, x1, y1, cells2, x2, y2)
+  results = []
+  time = 0
+  for horizon_time in horizon_times:
+    assert horizon_time >= time
+    if (cycle_interval > 0):
+      grid = run_torus_cycles(grid[np.newaxis], horizon_time - time, \
+        engine, cycle_interval)[0]
+    else:
+      grid = run_torus(grid, horizon_time - time, engine)
+    time = horizon_time
+    results.append(count_grid_colours(grid))
+  return results
+#
+# torus_contest_batch(placements, g_width, g_height, g_time, engine, \
+#   max_batch, cycle_interval)
+# -- returns a list of [red, blue, orange, green], one for each placement
+#
+def torus_contest_batch(placements, g_width, g_height, g_time, engine, \
+  max_batch, cycle_interval):
+  """
+  Run a batch of contests that all use toroids of the same size and
+  the same number of steps. Each placement is a list of the form
+  [cells1, x1, y1, cells2, x2, y2], as for torus_contest(). The
+  toroids are stacked in a three-dimensional array and stepped
+  together, at most max_batch toroids at a time. The results are
+  the same as calling torus_contest() for each placement.
+  """
+  assert max_batch > 0
+  results = []
+  for start in range(0, len(placements), max_batch):
+    chunk = placements[start:(start + max_batch)]
+    grids = np.zeros((len(chunk), g_width, g_height), dtype=np.uint8)
+    for (k, placement) in enumerate(chunk):
+      [cells1, x1, y1, cells2, x2, y2] = placement
+      place_seeds(grids[k], cells1, x1, y1, cells2, x2, y2)
+    if (cycle_interval > 0):
+      grids = run_torus_cycles(grids, g_time, engine, cycle_interval)
+    else:
+      grids = run_torus(grids, g_time, engine)
+    for k in range(len(chunk)):
+      results.append(count_grid_colours(grids[k]))
+  return results
+#
+#
+#
@@ -0,0 +1,241 @@
+"""
+Model Farm
+
+A farm of Golly workers on one machine, for running contests on
+several cores. Each worker is a Golly instance running
+farm_worker.py, which takes jobs from a shared job directory, scores
+them, and writes the results back.
+"""
+import model_parameters as mparam
+import random as rand
+import pickle
+import time
+import os
+"""
+Jobs and results
+"""
+#
+# Note: a job is a list [job_name, seed1, seed2, width_factor,
+# height_factor, time_factor, num_trials, job_seed], stored as a
+# pickle in the file job_name.job in the job directory. The result of
+# a job is a list [job_name, score1, score2], stored in the file
+# job_name.result. Every file is written under a temporary name and
+# then renamed, so a reader never sees a partly written file. A
+# worker claims a job by renaming job_name.job to
+# job_name.<worker_name>; a rename either succeeds for exactly one
+# worker or fails, so no job is run twice. The claimed file is only
+# removed after the result has been written; if the worker dies
+# first, the main process renames the claimed file back to
+# job_name.job after farm_timeout seconds (see requeue_jobs()).
+# Before scoring a job, the worker seeds the random number generator
+# with job_seed, so the scores do not depend on which worker runs the
+# job.
+#
+# A worker stops when the file named stop_name is in the job
+# directory. A stop file left over from an earlier run is removed
+# when the main process sends new jobs (see score_pairs()).
+#
+stop_name = "stop"
+#
+# Seconds to wait between looks at the job directory.
+#
+poll_seconds = 0.05
+#
+# A counter for making unique job names.
+#
+job_count = 0
+#
+# write_pickle(file_path, item) -- returns NULL
+#
+def write_pickle(file_path, item):
+  """
+  Write a pickle of item to file_path, atomically.
+  """
+  temp_path = file_path + ".tmp"
+  temp_handle = open(temp_path, "wb")
+  pickle.dump(item, temp_handle)
+  temp_handle.close()
+  os.replace(temp_path, file_path)
+#
+# read_pickle(file_path) -- returns item
+#
+def read_pickle(file_path):
+  file_handle = open(file_path, "rb")
+  item = pickle.load(file_handle)
+  file_handle.close()
+  return item
+#
+# submit_job(farm_directory, seed1, seed2, width_factor, height_factor, \
+#   time_factor, num_trials, job_seed) -- returns job_name
+#
+def submit_job(farm_directory, seed1, seed2, width_factor, height_factor, \
+  time_factor, num_trials, job_seed):
+  """
+  Put a job for scoring seed1 against seed2 in the job directory.
+  The job_seed is the stream key for the job's random number
+  generator (see draw_stream_key() in model_functions.py).
+  """
+  global job_count
+  job_count += 1
+  job_name = "job-" + str(os.getpid()) + "-" + str(job_count)
+  job = [job_name, seed1, seed2, width_factor, height_factor, \
+    time_factor, num_trials, job_seed]
+  write_pickle(os.path.join(farm_directory, job_name + ".job"), job)
+  return job_name
+#
+# claim_job(farm_directory, worker_name) -- returns job or None
+#
+def claim_job(farm_directory, worker_name):
+  """
+  Claim one of the waiting jobs in the job directory, if any. The
+  claimed file stays in the job directory until the worker has
+  written the result (see serve_jobs()).
+  """
+  for file_name in sorted(os.listdir(farm_directory)):
+    if (not file_name.endswith(".job")):
+      continue
+    job_path = os.path.join(farm_directory, file_name)
+    claimed_path = job_path[:- len(".job")] + "." + worker_name
+    try:
+      os.rename(job_path, claimed_path)
+      os.utime(claimed_path) # the claim time, for requeue_jobs()
+      job = read_pickle(claimed_path)
+    except OSError:
+      continue # another worker claimed the job first, or requeued it
+    return job
+  return None
+#
+# requeue_jobs(farm_directory, job_names, timeout) -- returns the
+# number of jobs put back
+#
+def requeue_jobs(farm_directory, job_names, timeout):
+  """
+  Put back the given jobs that a worker claimed more than timeout
+  seconds ago and has not finished, so that another worker can run
+  them. If the first worker finishes after all, the job is run
+  twice, with the same job_seed and therefore the same result.
+  """
+  names = set(job_names)
+  num_jobs = 0
+  for file_name in os.listdir(farm_directory):
+    [job_name, extension] = os.path.splitext(file_name)
+    if ((job_name not in names) or \
+      (extension in [".job", ".result", ".tmp"])):
+      continue
+    claimed_path = os.path.join(farm_directory, file_name)
+    try:
+      if (time.time() - os.path.getmtime(claimed_path) < timeout):
+        continue
+      os.rename(claimed_path, os.path.join(farm_directory, \
+        job_name + ".job"))
+    except OSError:
+      continue # the worker finished the job in the meantime
+    num_jobs += 1
+  return num_jobs
+#
+# run_job(g, job, score_function) -- returns result
+#
+def run_job(g, job, score_function):
+  """
+  Score a job with score_function (normally score_pair() in
+  model_functions.py), using the job's own random number seed. The
+  state of the caller's random number generator is restored after
+  the job, so that the in-process worker (see collect_results())
+  does not disturb the main process.
+  """
+  [job_name, seed1, seed2, width_factor, height_factor, \
+    time_factor, num_trials, job_seed] = job
+  saved_state = rand.getstate()
+  rand.seed(job_seed)
+  [score1, score2] = score_function(g, seed1, seed2, width_factor, \
+    height_factor, time_factor, num_trials)
+  rand.setstate(saved_state)
+  return [job_name, score1, score2]
+#
+# serve_jobs(g, farm_directory, worker_name, score_function, \
+#   stop_when_idle) -- returns the number of jobs run
+#
+def serve_jobs(g, farm_directory, worker_name, score_function, \
+  stop_when_idle):
+  """
+  Run jobs from the job directory and write their results, until
+  the stop file appears or, if stop_when_idle is True, until there
+  are no more waiting jobs.
+  """
+  num_jobs = 0
+  while (not os.path.exists(os.path.join(farm_directory, stop_name))):
+    job = claim_job(farm_directory, worker_name)
+    if (job == None):
+      if (stop_when_idle):
+        break
+      time.sleep(poll_seconds)
+      continue
+    result = run_job(g, job, score_function)
+    write_pickle(os.path.join(farm_directory, job[0] + ".result"), result)
+    try:
+      os.remove(os.path.join(farm_directory, job[0] + "." + worker_name))
+    except OSError:
+      pass # the job was requeued while it ran
+    num_jobs += 1
+  return num_jobs
+#
+# collect_results(g, farm_directory, job_names, score_function)
+# -- returns a list of [score1, score2], one for each job
+#
+def collect_results(g, farm_directory, job_names, score_function):
+  """
+  Wait for the results of the given jobs and remove the result files.
+  With farm_mode "in_process", the main process runs the jobs
+  itself while it waits, in the same way as a Golly worker; this
+  fake worker is for testing the farm without Golly instances. Jobs
+  that were claimed more than farm_timeout seconds ago without a
+  result are put back for another worker (see requeue_jobs()).
+  """
+  results = {} # maps job_name to [score1, score2]
+  last_requeue = time.time()
+  while (len(results) < len(job_names)):
+    if (mparam.farm_mode == "in_process"):
+      serve_jobs(g, farm_directory, "in_process", score_function, True)
+    found = False
+    for job_name in job_names:
+      result_path = os.path.join(farm_directory, job_name + ".result")
+      if ((job_name not in results) and os.path.exists(result_path)):
+        [result_name, score1, score2] = read_pickle(result_path)
+        assert result_name == job_name
+        os.remove(result_path)
+        results[job_name] = [score1, score2]
+        found = True
+    if (not found):
+      time.sleep(poll_seconds)
+    if (time.time() - last_requeue > mparam.farm_timeout):
+      requeue_jobs(farm_directory, [job_name for job_name in job_names \
+        if (job_name not in results)], mparam.farm_timeout)
+      last_requeue = time.time()
+  return [results[job_name] for job_name in job_names]
+#
+# score_pairs(g, seed_pairs, width_factor, height_factor, time_factor, \
+#   num_trials, score_function) -- returns a list of [score1, score2]
+#
+def score_pairs(g, seed_pairs, width_factor, height_factor, time_factor, \
+  num_trials, score_function):
+  """
+  Score every [seed1, seed2, stream_key] in seed_pairs on the farm,
+  in the job directory farm_directory from model_parameters.py, and
+  return the scores in the same order.
+  """
+  farm_directory = mparam.farm_directory
+  if (not os.path.exists(farm_directory)):
+    os.makedirs(farm_directory)
+  # a stop file from an earlier run would stop the workers (and the
+  # in-process worker) before they run these jobs
+  stop_path = os.path.join(farm_directory, stop_name)
+  if (os.path.exists(stop_path)):
+    os.remove(stop_path)
+  job_names = []
+  for [seed1, seed2, stream_key] in seed_pairs:
+    job_names.append(submit_job(farm_directory, seed1, seed2, \
+      width_factor, height_factor, time_factor, num_trials, stream_key))
+  return collect_results(g, farm_directory, job_names, score_function)
+#
+#
+#
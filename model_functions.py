@@ -6,6 +6,9 @@ Peter Turney, December 13, 2021
 import golly as g
 import model_classes as mclass
 import model_parameters as mparam
+import model_engine as meng
+import model_hashlife as mhash
+import model_farm as mfarm
 import random as rand
 import numpy as np
 import copy
@@ -14,7 +17,6 @@ import pickle
 import os
 import re
 import sys
-import pyautogui # tool for taking photos of the screen
 """
 Various functions for working with Golly
 """
@@ -78,6 +80,16 @@ def get_minmax(g):
   # get height and width
   g_xspan = g.getwidth()
   g_yspan = g.getheight()
+  #
+  return torus_minmax(g_xspan, g_yspan)
+#
+# torus_minmax(g_xspan, g_yspan) -- returns [g_xmin, g_xmax, g_ymin, g_ymax]
+#
+def torus_minmax(g_xspan, g_yspan):
+  """
+  Calculate the min and max of the coordinates of a Golly toroid
+  with the given width and height.
+  """
   # calculate min and max
   g_xmin = - int(g_xspan / 2)
   g_xmax = g_xspan + g_xmin
@@ -100,19 +112,10 @@ def count_pops(g):
   # 4 = player 2 with interaction  = green (blue + yellow)
   # 5 = border marker              = purple
   #
-  # find the min and max of the Golly toroid coordinates
-  [g_xmin, g_xmax, g_ymin, g_ymax] = get_minmax(g)
-  #
-  count1 = 0 # red/orange
-  count2 = 0 # blue/green
+  counts = count_states(g)
   #
-  for x in range(g_xmin, g_xmax):
-    for y in range(g_ymin, g_ymax):
-      a = g.getcell(x, y)
-      if (a == 1) or (a == 3):
-        count1 += 1
-      elif (a == 2) or (a == 4):
-        count2 += 1
+  count1 = int(counts[1] + counts[3]) # red/orange
+  count2 = int(counts[2] + counts[4]) # blue/green
   #
   return [count1, count2]
 #
@@ -131,27 +134,35 @@ def count_colours(g):
   # 4 = player 2 with interaction  = green (blue + yellow)
   # 5 = border marker              = purple
   #
+  counts = count_states(g)
+  #
+  red    = int(counts[1])
+  blue   = int(counts[2])
+  orange = int(counts[3])
+  green  = int(counts[4])
+  #
+  return [red, blue, orange, green]
+#
+# count_states(g) -- returns counts
+#
+def count_states(g):
+  """
+  Count the number of cells in each of the six states of the
+  Management Game in the Golly toroid, with one bulk fetch of the
+  cells from Golly. Returns an array with one count for each state.
+  White cells (state 0) are not in Golly's cell lists, so their
+  count is zero.
+  """
   # find the min and max of the Golly toroid coordinates
   [g_xmin, g_xmax, g_ymin, g_ymax] = get_minmax(g)
   #
-  red    = 0
-  blue   = 0
-  orange = 0
-  green  = 0
-  #
-  for x in range(g_xmin, g_xmax):
-    for y in range(g_ymin, g_ymax):
-      a = g.getcell(x, y)
-      if (a == 1):
-        red += 1
-      elif (a == 2):
-        blue += 1
-      elif (a == 3):
-        orange += 1
-      elif (a == 4):
-        green += 1
+  # the cell list has the form [x1, y1, state1, x2, y2, state2, ...],
+  # possibly with a final 0 to make its length odd
+  cell_list = g.getcells([g_xmin, g_ymin, g_xmax - g_xmin, g_ymax - g_ymin])
+  num_cells = len(cell_list) // 3
+  states = np.array(cell_list[0:(3 * num_cells)], dtype=np.int64)[2::3]
   #
-  return [red, blue, orange, green]
+  return np.bincount(states, minlength=meng.num_states)
 #
 # initialize_population(pop_size, s_xspan, s_yspan, seed_density)
 # -- returns population
@@ -189,7 +200,16 @@ def initialize_population(pop_size, s_xspan, s_yspan, seed_density):
     # Add the seed to the population.
     population.append(seed) 
     #
-  return population
+  # Keep the histories of the seeds in a score matrix. The rows of
+  # replaced seeds are only remembered for duplicate genomes (see
+  # transplant_history()).
+  #
+  if (mparam.duplicate_genomes):
+    memory = mparam.duplicate_memory
+  else:
+    memory = 0
+  return mclass.Population(population, mparam.num_trials, memory, \
+    mparam.duplicate_orientation)
 #
 # dimensions(s1, s2, width_factor, height_factor, time_factor)
 # -- returns [g_width, g_height, g_time]
@@ -222,150 +242,429 @@ def dimensions(s1, s2, width_factor, height_factor, time_factor):
   #
   return [g_width, g_height, g_time]
 #
-# score_pair(g, seed1, seed2, width_factor, height_factor, \
-#   time_factor, num_trials) -- returns [score1, score2]
+# random_placement(s1, s2, g_width, g_height) -- returns [x1, y1, x2, y2]
+#
+def random_placement(s1, s2, g_width, g_height):
+  """
+  Randomly choose locations for the seeds s1 and s2 in a toroid of
+  width g_width and height g_height, in the same way as s1.insert()
+  and s2.insert(): s1 somewhere in the left side of the toroid and
+  s2 somewhere in the right side. The NumPy engine counts coordinates
+  from the corner of the toroid, instead of the centre, so the
+  locations are returned relative to the corner.
+  """
+  [g_xmin, g_xmax, g_ymin, g_ymax] = torus_minmax(g_width, g_height)
+  [x1, y1] = s1.random_location(g_xmin, -1, g_ymin, g_ymax)
+  [x2, y2] = s2.random_location(+1, g_xmax, g_ymin, g_ymax)
+  return [x1 - g_xmin, y1 - g_ymin, x2 - g_xmin, y2 - g_ymin]
+#
+# The Golly session for contests, made when it is first needed (see
+# GollySession in model_classes.py and golly_layers in
+# model_parameters.py).
 #
-def score_pair(g, seed1, seed2, width_factor, height_factor, \
-  time_factor, num_trials):
+golly_session = None
+#
+# The Golly algorithms that calibrate_algos.py compares, and the cost
+# model that it writes, read when it is first needed (see golly_algo
+# in model_parameters.py).
+#
+golly_algos = ["QuickLife", "HashLife"]
+algo_model = None
+#
+# read_algo_model(model_path) -- returns list of
+#   [g_width, g_height, g_time, quicklife_seconds, hashlife_seconds]
+#
+def read_algo_model(model_path):
   """
-  Put seed1 and seed2 into the Immigration Game g and see which 
-  one wins and which one loses. Note that this function does
-  not update the histories of the seeds. For updating histories,
-  use update_history().
+  Read the cost model written by calibrate_algos.py: for each
+  calibrated toroid size and number of steps, the average seconds
+  per contest for each of the algorithms in golly_algos. Return an
+  empty list if there is no cost model.
+  """
+  if (not os.path.exists(model_path)):
+    return []
+  model_handle = open(model_path, "r")
+  lines = model_handle.readlines()
+  model_handle.close()
+  assert lines[0].strip().split("\t")[3:] == golly_algos
+  model_rows = []
+  for line in lines[1:]:
+    fields = line.strip().split("\t")
+    if (len(fields) == 3 + len(golly_algos)):
+      model_rows.append([int(fields[0]), int(fields[1]), int(fields[2])] + \
+        [float(field) for field in fields[3:]])
+  return model_rows
+#
+# choose_algo(g_width, g_height, g_time) -- returns algo
+#
+def choose_algo(g_width, g_height, g_time):
+  """
+  Choose the Golly algorithm for a contest in a toroid of width
+  g_width and height g_height that runs for g_time steps, as
+  specified by golly_algo in model_parameters.py. For "auto", find
+  the calibrated contest that is nearest in area and in steps, on a
+  log scale, and return the algorithm that was fastest for it.
+  """
+  if (mparam.golly_algo != "auto"):
+    return mparam.golly_algo
+  global algo_model
+  if (algo_model == None):
+    algo_model = read_algo_model(mparam.algo_model_path)
+  if (len(algo_model) == 0):
+    return "QuickLife"
+  best_distance = None
+  for row in algo_model:
+    [m_width, m_height, m_time] = row[0:3]
+    distance = np.log((m_width * m_height) / (g_width * g_height)) ** 2 + \
+      np.log(max(m_time, 1) / max(g_time, 1)) ** 2
+    if ((best_distance == None) or (distance < best_distance)):
+      best_distance = distance
+      seconds = row[3:]
+  return golly_algos[int(np.argmin(seconds))]
+#
+# contest_colours(g, s1, s2, g_width, g_height, g_time)
+# -- returns [red, blue, orange, green]
+#
+def contest_colours(g, s1, s2, g_width, g_height, g_time):
+  """
+  Put the red seed s1 and the blue seed s2 into a toroid of width
+  g_width and height g_height, run the Management Game for g_time
+  steps, and count the final colours. The contest is run either in
+  Golly or in one of the engines in model_engine.py, as specified by
+  contest_engine in model_parameters.py. All of the engines use the
+  same random placement of the seeds and give the same counts.
+  """
+  return contest_colours_horizons(g, s1, s2, g_width, g_height, \
+    [g_time])[0]
+#
+# contest_colours_horizons(g, s1, s2, g_width, g_height, horizon_times)
+# -- returns a list of [red, blue, orange, green], one for each horizon
+#
+def contest_colours_horizons(g, s1, s2, g_width, g_height, horizon_times):
+  """
+  Like contest_colours(), but count the colours at each of the times
+  in horizon_times (in ascending order), during one run of the
+  contest. The counts at each time are the same as the counts from
+  contest_colours() with g_time set to that time.
   """
   #
-  # Make copies of the original two seeds, so that the following
-  # manipulations do not change the originals.
+  # Find the min and max of the toroid coordinates
   #
-  s1 = copy.deepcopy(seed1)
-  s2 = copy.deepcopy(seed2)
+  [g_xmin, g_xmax, g_ymin, g_ymax] = torus_minmax(g_width, g_height)
   #
-  # Verify that the seeds are limited to 0 (white), 1 (red), and
-  # 5 (purple).
+  if (mparam.contest_engine != "golly"):
+    [x1, y1, x2, y2] = random_placement(s1, s2, g_width, g_height)
+    return meng.torus_contest_horizons(s1.cells, x1, y1, s2.cells, \
+      x2, y2, g_width, g_height, horizon_times, mparam.contest_engine, \
+      mparam.cycle_interval)
   #
-  assert s1.check_colour() == True
-  assert s2.check_colour() == True
+  assert mparam.contest_engine == "golly"
   #
-  # Check the number of living cells in the seeds. If the number
-  # is zero, it is probably a mistake. The number is initially
-  # set to zero and it should be updated when the seed is filled
-  # with living cells. We could use s1.count_ones() here, but
-  # we're trying to be efficient by counting only once and 
-  # storing the count.
+  # Golly algorithm -- "HashLife" or "QuickLife"
   #
-  assert s1.num_living > 0
-  assert s2.num_living > 0
+  algo = choose_algo(g_width, g_height, horizon_times[-1])
   #
-  # Initialize scores
+  # g = the Golly universe
   #
-  score1 = 0.0
-  score2 = 0.0
+  golly_torus(g, g_width, g_height, algo)
   #
-  # Run several trials with different rotations and locations.
+  # Randomly place seed s1 somewhere in the left side of the toroid
   #
-  for trial in range(num_trials):
-    #
-    # Randomly rotate and flip s1 and s2
-    #
-    s1 = s1.random_rotate()
-    s2 = s2.random_rotate()
-    #
-    # Switch cells in the second seed (s2) from state 1 (red) to state 2 (blue)
-    #
-    s2.red2blue()
-    #
-    # Rule file
-    #
-    rule_name = "Management"
-    #
-    # Set toroidal universe of height yspan and width xspan
-    # Base the s1ze of the universe on the s1zes of the seeds
-    #
-    # g = the Golly universe
-    #
-    [g_width, g_height, g_time] = dimensions(s1, s2, \
-      width_factor, height_factor, time_factor)
+  [x1, y1] = s1.insert(g, g_xmin, -1, g_ymin, g_ymax)
+  #
+  # Randomly place seed s2 somewhere in the right side of the toroid
+  #
+  [x2, y2] = s2.insert(g, +1, g_xmax, g_ymin, g_ymax)
+  #
+  # Run for a fixed number of generations.
+  # Base the number of generations on the sizes of the seeds.
+  # Note that these are generations inside one Game of Life, not
+  # generations in an evolutionary sense. Generations in the 
+  # Game of Life correspond to growth and decay of a phenotype,
+  # whereas generations in evolution correspond to the reproduction
+  # of a genotype.
+  #
+  colours = run_golly_horizons(g, g_width, g_height, horizon_times)
+  #
+  # Record the contest in the corpus. The locations are stored
+  # relative to the corner of the toroid, as in random_placement().
+  #
+  if (mparam.corpus_interval > 0):
+    global corpus_count
+    corpus_count += 1
+    if (corpus_count % mparam.corpus_interval == 0):
+      record_contest(mparam.corpus_path, [s1.unique_ID_num, \
+        s2.unique_ID_num, s1.cells, x1 - g_xmin, y1 - g_ymin, s2.cells, \
+        x2 - g_xmin, y2 - g_ymin, g_width, g_height, horizon_times, colours])
+  #
+  return colours
+#
+# golly_torus(g, g_width, g_height, algo) -- returns NULL
+#
+def golly_torus(g, g_width, g_height, algo):
+  """
+  Make the current Golly universe an empty Management toroid of
+  width g_width and height g_height, run by the Golly algorithm algo.
+  """
+  rule_name = "Management"
+  if (mparam.golly_layers > 0):
     #
-    # set algorithm -- "HashLife" or "QuickLife"
+    # reuse a Golly layer that already has a toroid of this size
     #
-    g.setalgo("QuickLife") # use "HashLife" or "QuickLife"
+    global golly_session
+    if (golly_session == None):
+      golly_session = mclass.GollySession(rule_name, mparam.golly_layers)
+    golly_session.prepare(g, g_width, g_height, algo)
+  else:
+    g.setalgo(algo)
     g.autoupdate(False) # do not update the view unless requested
     g.new(rule_name) # initialize cells to state 0
     g.setrule(rule_name + ":T" + str(g_width) + "," + str(g_height)) # make a toroid
-    #
-    # Find the min and max of the Golly toroid coordinates
-    #
-    [g_xmin, g_xmax, g_ymin, g_ymax] = get_minmax(g)
-    #
-    # Set magnification for Golly viewer
-    #
+  #
+  # Set magnification for Golly viewer
+  #
+  if (not mparam.headless_mode):
     g.setmag(set_mag(g))
-    #
-    # Randomly place seed s1 somewhere in the left s1de of the toroid
-    #
-    s1.insert(g, g_xmin, -1, g_ymin, g_ymax)
-    #
-    # Randomly place seed s2 somewhere in the right s1de of the toroid
-    #
-    s2.insert(g, +1, g_xmax, g_ymin, g_ymax)
-    #
-    # Run for a fixed number of generations.
-    # Base the number of generations on the sizes of the seeds.
-    # Note that these are generations ins1de one Game of Life, not
-    # generations in an evolutionary sense. Generations in the 
-    # Game of Life correspond to growth and decay of a phenotype,
-    # whereas generations in evolution correspond to the reproduction
-    # of a genotype.
-    #
-    g.run(g_time) # run the Game of Life for g_time time steps
-    g.update() # need to update Golly to get counts
-    #
-    # Count the populations of the two colours. State 1 = red = seed1.
-    # State 2 = blue = seed2.
-    #
-    [count1, count2] = count_pops(g)
-    #
-    # We need to make an adjustment to these counts. We don't want to 
-    # use the total count of living cells; instead we want to use
-    # the increase in the number of living cells over the course of
-    # the contest between the two organisms. The idea here is that
-    # we want to reward seeds according to their growth during the
-    # contest, not according to their initial states. This should
-    # avoid an evolutionary bias towards larger seeds simply due
-    # to size rather than due to functional properties. It should
-    # also encourage efficient use of living cells, as opposed to
-    # simply ignoring useless living cells.
-    #
-    # s1.num_living = initial number of living cells in s1
-    # s2.num_living = initial number of living cells in s2
-    #
-    if (s1.num_living < count1):
-      count1 = count1 - s1.num_living
-    else:
-      count1 = 0
-    #
-    if (s2.num_living < count2):
-      count2 = count2 - s2.num_living
-    else:
-      count2 = 0
-    #
-    # Now we are ready to determine the winner.
-    #
-    if (count1 > count2):
-      score1 = score1 + 1.0
-    elif (count2 > count1):
-      score2 = score2 + 1.0
-    else:
-      score1 = score1 + 0.5
-      score2 = score2 + 0.5
-    #
+#
+# run_golly_horizons(g, g_width, g_height, horizon_times)
+# -- returns a list of [red, blue, orange, green], one for each horizon
+#
+def run_golly_horizons(g, g_width, g_height, horizon_times):
+  """
+  Run the toroid in the current Golly universe and count the colours
+  at each of the times in horizon_times (in ascending order).
+  """
+  [g_xmin, g_xmax, g_ymin, g_ymax] = torus_minmax(g_width, g_height)
+  colours = []
+  time = 0
+  for horizon_time in horizon_times:
+    assert horizon_time >= time
+    if (mparam.cycle_interval > 0):
+      # stop early if the toroid falls into a cycle
+      run_torus_cycles(g, g_xmin, g_ymin, g_width, g_height, \
+        horizon_time - time, mparam.cycle_interval)
+    elif (horizon_time > time):
+      g.run(horizon_time - time) # run the Game of Life up to horizon_time
+    time = horizon_time
+    if (not mparam.headless_mode):
+      g.update() # update the view
+    colours.append(count_colours(g))
   #
-  # Normalize the scores
+  return colours
+#
+# The number of contests run in Golly so far, for choosing which
+# contests to record in the corpus (see corpus_interval in
+# model_parameters.py).
+#
+corpus_count = 0
+#
+# record_contest(corpus_path, record) -- returns NULL
+#
+def record_contest(corpus_path, record):
+  """
+  Append a contest record to the corpus file. The corpus is a
+  sequence of pickles, one for each contest, of the form:
+  [ID1, ID2, cells1, x1, y1, cells2, x2, y2, g_width, g_height,
+  horizon_times, colours], where cells1 and cells2 are the rotated
+  seeds (cells2 is blue), (x1, y1) and (x2, y2) are the locations of
+  their top left corners, counting from the corner of the toroid, and
+  colours is the list of [red, blue, orange, green] counts from Golly,
+  one for each of the horizon_times.
+  """
+  corpus_handle = open(corpus_path, "ab")
+  pickle.dump(record, corpus_handle)
+  corpus_handle.close()
+#
+# read_corpus(corpus_path) -- returns list of records
+#
+def read_corpus(corpus_path):
+  """
+  Read all of the contest records in the corpus file.
+  """
+  records = []
+  corpus_handle = open(corpus_path, "rb")
+  while True:
+    try:
+      records.append(pickle.load(corpus_handle))
+    except EOFError:
+      break
+  corpus_handle.close()
+  return records
+#
+# replay_contest(g, record, engine) -- returns list of
+#   [red, blue, orange, green], one for each horizon
+#
+def replay_contest(g, record, engine):
+  """
+  Run a recorded contest again in the given engine ("golly" or one
+  of the engines in model_engine.py), with the same seeds, locations,
+  toroid, and numbers of steps, and count the colours.
+  """
+  [id1, id2, cells1, x1, y1, cells2, x2, y2, g_width, g_height, \
+    horizon_times, colours] = record
+  if (engine != "golly"):
+    return meng.torus_contest_horizons(cells1, x1, y1, cells2, x2, y2, \
+      g_width, g_height, horizon_times, engine, mparam.cycle_interval)
+  [g_xmin, g_xmax, g_ymin, g_ymax] = torus_minmax(g_width, g_height)
+  golly_torus(g, g_width, g_height, \
+    choose_algo(g_width, g_height, horizon_times[-1]))
+  for [cells, x, y] in [[cells1, x1, y1], [cells2, x2, y2]]:
+    s = mclass.Seed(cells.shape[0], cells.shape[1], 0)
+    s.cells = cells
+    g.putcells(s.cell_list(g_xmin + x, g_ymin + y, True))
+  return run_golly_horizons(g, g_width, g_height, horizon_times)
+#
+# run_torus_cycles(g, g_xmin, g_ymin, g_width, g_height, g_time, \
+#   cycle_interval) -- returns NULL
+#
+def run_torus_cycles(g, g_xmin, g_ymin, g_width, g_height, g_time, \
+  cycle_interval):
+  """
+  Run the toroid in Golly for g_time steps, in chunks of cycle_interval
+  steps, hashing the toroid after each chunk. When the hash repeats
+  a hash from p steps earlier, the toroid has probably fallen into a
+  cycle of period p. Hashes can collide, so we confirm the cycle by
+  running p more steps and comparing the cells exactly. Then the
+  state after g_time steps is the same as the state after
+  (g_time - time) mod p more steps, so we skip the rest of the run.
+  This matches model_engine.run_torus_cycles().
+  """
+  rect = [g_xmin, g_ymin, g_width, g_height]
+  seen = {g.hash(rect): 0} # maps hash to time
+  time = 0
+  while (time < g_time):
+    chunk = min(cycle_interval, g_time - time)
+    g.run(chunk)
+    time += chunk
+    if (time == g_time):
+      return
+    key = g.hash(rect)
+    if (key in seen):
+      period = time - seen[key]
+      if (period <= g_time - time):
+        cells = g.getcells(rect)
+        g.run(period)
+        time += period
+        if (g.getcells(rect) == cells):
+          remaining = (g_time - time) % period
+          if (remaining > 0):
+            g.run(remaining)
+          return
+        # the hashes collided, so keep going
+        key = g.hash(rect)
+    seen[key] = time
+#
+# immigration_points(s1, s2, red, blue, orange, green)
+# -- returns [points1, points2]
+#
+def immigration_points(s1, s2, red, blue, orange, green):
+  """
+  Given the final colour counts of one trial of a contest between
+  the red seed s1 and the blue seed s2, decide the winner of the
+  trial: one point for the winner, zero for the loser, or half a
+  point each for a tie.
+  """
+  #
+  # Count the populations of the two colours: red/orange for seed1
+  # and blue/green for seed2.
+  #
+  count1 = red + orange
+  count2 = blue + green
+  #
+  # We need to make an adjustment to these counts. We don't want to 
+  # use the total count of living cells; instead we want to use
+  # the increase in the number of living cells over the course of
+  # the contest between the two organisms. The idea here is that
+  # we want to reward seeds according to their growth during the
+  # contest, not according to their initial states. This should
+  # avoid an evolutionary bias towards larger seeds simply due
+  # to size rather than due to functional properties. It should
+  # also encourage efficient use of living cells, as opposed to
+  # simply ignoring useless living cells.
+  #
+  # s1.num_living = initial number of living cells in s1
+  # s2.num_living = initial number of living cells in s2
+  #
+  if (s1.num_living < count1):
+    count1 = count1 - s1.num_living
+  else:
+    count1 = 0
   #
-  score1 = score1 / num_trials
-  score2 = score2 / num_trials
+  if (s2.num_living < count2):
+    count2 = count2 - s2.num_living
+  else:
+    count2 = 0
   #
-  return [score1, score2]
+  # Now we are ready to determine the winner.
+  #
+  if (count1 > count2):
+    points1 = 1.0
+    points2 = 0.0
+  elif (count2 > count1):
+    points1 = 0.0
+    points2 = 1.0
+  else:
+    points1 = 0.5
+    points2 = 0.5
+  #
+  return [points1, points2]
+#
+# management_points(red, blue, orange, green) -- returns [points1, points2]
+#
+def management_points(red, blue, orange, green):
+  """
+  Given the final colour counts of one trial of a contest, decide
+  the winner of the trial in the Management Game: the red seed is
+  rewarded for orange cells and the blue seed for green cells.
+  """
+  count1 = orange # the red seed is rewarded for orange cells
+  count2 = green  # the blue seed is rewarded for green cells
+  #
+  if (count1 > count2):
+    points1 = 1.0
+    points2 = 0.0
+  elif (count2 > count1):
+    points1 = 0.0
+    points2 = 1.0
+  else:
+    points1 = 0.5
+    points2 = 0.5
+  #
+  return [points1, points2]
+#
+# score_pair(g, seed1, seed2, width_factor, height_factor, \
+#   time_factor, num_trials) -- returns [score1, score2]
+#
+def score_pair(g, seed1, seed2, width_factor, height_factor, \
+  time_factor, num_trials):
+  """
+  Put seed1 and seed2 into the Immigration Game g and see which 
+  one wins and which one loses. Note that this function does
+  not update the histories of the seeds. For updating histories,
+  use update_history().
+  """
+  return score_pair_horizons(g, seed1, seed2, width_factor, \
+    height_factor, time_factor, num_trials, [1.0])[0]
+#
+# score_pair_horizons(g, seed1, seed2, width_factor, height_factor, \
+#   time_factor, num_trials, horizons) -- returns a list of [score1, score2]
+#
+def score_pair_horizons(g, seed1, seed2, width_factor, height_factor, \
+  time_factor, num_trials, horizons):
+  """
+  Like score_pair(), but score the pair at several horizons during
+  one run of each trial. Each horizon is a fraction of time_factor,
+  in ascending order and ending at most at 1.0 (for example, [0.25,
+  0.5, 1.0] with time_factor set to the longest time factor of a
+  sweep), and the scores for a horizon are the same as the scores
+  from score_pair() with time_factor set to horizon * time_factor.
+  Returns one [score1, score2] for each horizon, in the order given.
+  This is a library function for parameter studies; the model
+  itself only scores at the full time_factor, through score_pair().
+  """
+  scores = score_trials(g, seed1, seed2, width_factor, height_factor, \
+    time_factor, num_trials, horizons, ["immigration"])
+  return [horizon_scores[0] for horizon_scores in scores]
 #
 # score_management(g, seed1, seed2, width_factor, height_factor, \
 #   time_factor, num_trials) -- returns [score1, score2]
@@ -378,6 +677,56 @@ def score_management(g, seed1, seed2, width_factor, height_factor, \
   Note that this function does not update the histories of the seeds. 
   For updating histories, use update_history().
   """
+  return score_trials(g, seed1, seed2, width_factor, height_factor, \
+    time_factor, num_trials, [1.0], ["management"])[0][0]
+#
+# score_pair_dual(g, seed1, seed2, width_factor, height_factor, \
+#   time_factor, num_trials)
+# -- returns [[immigration1, immigration2], [management1, management2]]
+#
+def score_pair_dual(g, seed1, seed2, width_factor, height_factor, \
+  time_factor, num_trials):
+  """
+  Score the pair with both fitness definitions from the same trials:
+  the Immigration scores, as in score_pair(), and the Management
+  scores, as in score_management(). Each trial is run once and both
+  scores are taken from its counts. With the same state of the
+  random number generator, the results are the same as
+  [score_pair(...), score_management(...)].
+  """
+  return score_trials(g, seed1, seed2, width_factor, height_factor, \
+    time_factor, num_trials, [1.0], ["immigration", "management"])[0]
+#
+# score_trials(g, seed1, seed2, width_factor, height_factor, \
+#   time_factor, num_trials, horizons, games)
+# -- returns scores, where scores[h][k] = [score1, score2]
+#
+def score_trials(g, seed1, seed2, width_factor, height_factor, \
+  time_factor, num_trials, horizons, games):
+  """
+  Run num_trials trials of a contest between seed1 and seed2, and
+  score each trial at every horizon (see score_pair_horizons()) for
+  every game in games: "immigration" scores as in score_pair() and
+  "management" scores as in score_management(). All of the scores
+  come from the same trials, so scores[h][k] is the [score1, score2]
+  of the k-th game at the h-th horizon.
+  """
+  #
+  # Check the horizons.
+  #
+  assert len(horizons) > 0, "score_trials: no horizons given"
+  assert horizons == sorted(horizons), \
+    "score_trials: horizons must be in ascending order"
+  for horizon in horizons:
+    assert (horizon > 0.0) and (horizon <= 1.0), \
+      "score_trials: horizon " + str(horizon) + \
+      " is not in the range 0 < horizon <= 1"
+    assert time_factor * horizon > 1.0, \
+      "score_trials: horizon " + str(horizon) + \
+      " gives a time factor of at most 1.0 (see dimensions())"
+  for game in games:
+    assert game in ["immigration", "management"], \
+      "score_trials: unknown game " + str(game)
   #
   # Make copies of the original two seeds, so that the following
   # manipulations do not change the originals.
@@ -385,6 +734,12 @@ def score_management(g, seed1, seed2, width_factor, height_factor, \
   s1 = copy.deepcopy(seed1)
   s2 = copy.deepcopy(seed2)
   #
+  # Verify that the seeds are limited to 0 (white), 1 (red), and
+  # 5 (purple).
+  #
+  assert s1.check_colour() == True
+  assert s2.check_colour() == True
+  #
   # Check the number of living cells in the seeds. If the number
   # is zero, it is probably a mistake. The number is initially
   # set to zero and it should be updated when the seed is filled
@@ -395,10 +750,9 @@ def score_management(g, seed1, seed2, width_factor, height_factor, \
   assert s1.num_living > 0
   assert s2.num_living > 0
   #
-  # Initialize scores
+  # Initialize scores, one pair for each horizon and game
   #
-  score1 = 0.0
-  score2 = 0.0
+  scores = [[[0.0, 0.0] for game in games] for horizon in horizons]
   #
   # Run several trials with different rotations and locations.
   #
@@ -413,79 +767,126 @@ def score_management(g, seed1, seed2, width_factor, height_factor, \
     #
     s2.red2blue()
     #
-    # Rule file
-    #
-    rule_name = "Management"
-    #
     # Set toroidal universe of height yspan and width xspan
-    # Base the s1ze of the universe on the s1zes of the seeds
-    #
-    # g = the Golly universe
-    #
-    [g_width, g_height, g_time] = dimensions(s1, s2, \
-      width_factor, height_factor, time_factor)
-    #
-    # set algorithm -- "HashLife" or "QuickLife"
-    #
-    g.setalgo("QuickLife") # use "HashLife" or "QuickLife"
-    g.autoupdate(False) # do not update the view unless requested
-    g.new(rule_name) # initialize cells to state 0
-    g.setrule(rule_name + ":T" + str(g_width) + "," + str(g_height)) # make a toroid
-    #
-    # Find the min and max of the Golly toroid coordinates
-    #
-    [g_xmin, g_xmax, g_ymin, g_ymax] = get_minmax(g)
-    #
-    # Set magnification for Golly viewer
-    #
-    g.setmag(set_mag(g))
-    #
-    # Randomly place seed s1 somewhere in the left s1de of the toroid
-    #
-    s1.insert(g, g_xmin, -1, g_ymin, g_ymax)
-    #
-    # Randomly place seed s2 somewhere in the right s1de of the toroid
-    #
-    s2.insert(g, +1, g_xmax, g_ymin, g_ymax)
-    #
-    # Run for a fixed number of generations.
-    # Base the number of generations on the sizes of the seeds.
-    # Note that these are generations ins1de one Game of Life, not
-    # generations in an evolutionary sense. Generations in the 
-    # Game of Life correspond to growth and decay of a phenotype,
-    # whereas generations in evolution correspond to the reproduction
-    # of a genotype.
-    #
-    g.run(g_time) # run the Game of Life for g_time time steps
-    g.update() # need to update Golly to get counts
-    #
-    # Count orange cells for red (s1, colour 1) and count green cells
-    # for blue (s2, colour 2). We don't need to subtract their initial
-    # count at t = 0, because their initial count is necessarily zero.
-    #
-    [red, blue, orange, green] = count_colours(g)
-    #
-    count1 = orange # the red seed is rewarded for orange cells
-    count2 = green  # the blue seed is rewarded for green cells
-    #
-    # Now we are ready to determine the winner.
-    #
-    if (count1 > count2):
-      score1 = score1 + 1.0
-    elif (count2 > count1):
-      score2 = score2 + 1.0
-    else:
-      score1 = score1 + 0.5
-      score2 = score2 + 0.5
+    # Base the size of the universe on the sizes of the seeds.
+    # The number of steps for each horizon is the number that
+    # dimensions() gives for that horizon's time factor.
+    #
+    horizon_times = []
+    for horizon in horizons:
+      [g_width, g_height, g_time] = dimensions(s1, s2, \
+        width_factor, height_factor, time_factor * horizon)
+      horizon_times.append(g_time)
+    #
+    # Run the contest and count the colours at each horizon. State
+    # 1 = red = seed1. State 2 = blue = seed2.
+    #
+    colours = contest_colours_horizons(g, s1, s2, g_width, g_height, \
+      horizon_times)
+    #
+    # Convert the counts to points for s1 and s2. For Immigration,
+    # red/orange counts for s1 and blue/green for s2; for Management,
+    # orange counts for s1 and green for s2.
+    #
+    for h in range(len(horizons)):
+      [red, blue, orange, green] = colours[h]
+      for (k, game) in enumerate(games):
+        if (game == "immigration"):
+          [points1, points2] = immigration_points(s1, s2, \
+            red, blue, orange, green)
+        else:
+          [points1, points2] = management_points(red, blue, orange, green)
+        scores[h][k][0] += points1
+        scores[h][k][1] += points2
     #
   #
   # Normalize the scores
   #
-  score1 = score1 / num_trials
-  score2 = score2 / num_trials
+  for h in range(len(horizons)):
+    for k in range(len(games)):
+      scores[h][k][0] = scores[h][k][0] / num_trials
+      scores[h][k][1] = scores[h][k][1] / num_trials
   #
+  return scores
+#
+# draw_stream_key(seed1, seed2) -- returns stream_key
+#
+def draw_stream_key(seed1, seed2):
+  """
+  Draw a stream key for the contests between seed1 and seed2 from
+  the main random number generator. If contest_streams is True, the
+  unique IDs of the seeds and the key are appended to stream_log_path,
+  so that the contests can be run again with score_pair_stream().
+  """
+  stream_key = rand.getrandbits(32)
+  if (mparam.contest_streams):
+    stream_handle = open(mparam.stream_log_path, "a")
+    stream_handle.write(str(seed1.unique_ID_num) + "\t" + \
+      str(seed2.unique_ID_num) + "\t" + str(stream_key) + "\n")
+    stream_handle.close()
+  return stream_key
+#
+# score_pair_stream(g, seed1, seed2, width_factor, height_factor, \
+#   time_factor, num_trials, stream_key) -- returns [score1, score2]
+#
+def score_pair_stream(g, seed1, seed2, width_factor, height_factor, \
+  time_factor, num_trials, stream_key):
+  """
+  Like score_pair(), but draw the random rotations and locations from
+  the stream with the given key. The state of the main random number
+  generator is restored afterwards, so the result only depends on
+  the seeds and the key.
+  """
+  saved_state = rand.getstate()
+  rand.seed(stream_key)
+  [score1, score2] = score_pair(g, seed1, seed2, width_factor, \
+    height_factor, time_factor, num_trials)
+  rand.setstate(saved_state)
   return [score1, score2]
 #
+# stream_frames(seed1, seed2, width_factor, height_factor, time_factor, \
+#   trial, stream_key) -- returns frames
+#
+def stream_frames(seed1, seed2, width_factor, height_factor, time_factor, \
+  trial, stream_key):
+  """
+  Run the given trial (counting from 0) of the contests between seed1
+  and seed2 in the stream with the given key, as score_pair_stream()
+  would, in the NumPy engine, and return every step of the contest
+  as an array of frames, frames[step][x][y], from step 0 to g_time.
+  """
+  saved_state = rand.getstate()
+  rand.seed(stream_key)
+  s1 = copy.deepcopy(seed1)
+  s2 = copy.deepcopy(seed2)
+  for k in range(trial + 1):
+    s1 = s1.random_rotate()
+    s2 = s2.random_rotate()
+    s2.red2blue()
+    [g_width, g_height, g_time] = dimensions(s1, s2, \
+      width_factor, height_factor, time_factor)
+    [x1, y1, x2, y2] = random_placement(s1, s2, g_width, g_height)
+  rand.setstate(saved_state)
+  grid = np.zeros((g_width, g_height), dtype=np.uint8)
+  meng.place_seeds(grid, s1.cells, x1, y1, s2.cells, x2, y2)
+  frames = [grid]
+  for step in range(g_time):
+    grid = meng.management_step(grid)
+    frames.append(grid)
+  return np.array(frames)
+#
+# record_score(pop, i, j, score) -- returns NULL
+#
+def record_score(pop, i, j, score):
+  """
+  Record the score of the i-th seed against the j-th seed in the
+  i-th seed's history and, for a Population, in its score matrix.
+  """
+  if (isinstance(pop, mclass.Population)):
+    pop.set_score(i, j, score)
+  else:
+    pop[i].history[j] = score
+#
 # update_history(g, pop, i, j, width_factor, height_factor, \
 #   time_factor, num_trials) -- returns NULL
 #
@@ -500,18 +901,182 @@ def update_history(g, pop, i, j, width_factor, height_factor, \
   # If i == j, let's just call it a tie.
   #
   if (i == j):
-    pop[i].history[i] = 0.5
+    record_score(pop, i, i, 0.5)
     return
   #
-  # Call score_pair()
+  # Call score_pair(), in the pair's own random stream if
+  # contest_streams is True
   #
-  [scorei, scorej] = score_pair(g, pop[i], pop[j], width_factor, \
-    height_factor, time_factor, num_trials)
+  if (mparam.contest_streams):
+    stream_key = draw_stream_key(pop[i], pop[j])
+    [scorei, scorej] = score_pair_stream(g, pop[i], pop[j], width_factor, \
+      height_factor, time_factor, num_trials, stream_key)
+  else:
+    [scorei, scorej] = score_pair(g, pop[i], pop[j], width_factor, \
+      height_factor, time_factor, num_trials)
   #
   # Update pop[i] and pop[j] with the new scores. 
   #
-  pop[i].history[j] = scorei
-  pop[j].history[i] = scorej
+  record_score(pop, i, j, scorei)
+  record_score(pop, j, i, scorej)
+  # 
+  # returns NULL
+  # 
+#
+# update_history_pairs(g, pop, pairs, width_factor, height_factor, \
+#   time_factor, num_trials) -- returns NULL
+#
+def update_history_pairs(g, pop, pairs, width_factor, height_factor, \
+  time_factor, num_trials):
+  """
+  Call update_history() for every [i, j] in pairs. With a farm of
+  Golly workers (see farm_mode in model_parameters.py), all of the
+  pairs are sent to the farm at once and scored in parallel.
+  """
+  if (mparam.farm_mode == "off"):
+    for [i, j] in pairs:
+      update_history(g, pop, i, j, width_factor, height_factor, \
+        time_factor, num_trials)
+    return
+  #
+  # If i == j, let's just call it a tie. Send the other pairs to
+  # the farm.
+  #
+  farm_pairs = []
+  for [i, j] in pairs:
+    if (i == j):
+      record_score(pop, i, i, 0.5)
+    else:
+      farm_pairs.append([i, j])
+  seed_pairs = [[pop[i], pop[j], draw_stream_key(pop[i], pop[j])] \
+    for [i, j] in farm_pairs]
+  scores = mfarm.score_pairs(g, seed_pairs, width_factor, height_factor, \
+    time_factor, num_trials, score_pair)
+  for ([i, j], [scorei, scorej]) in zip(farm_pairs, scores):
+    record_score(pop, i, j, scorei)
+    record_score(pop, j, i, scorej)
+  # 
+  # returns NULL
+  # 
+#
+# The number of contests (trials) that children with duplicate
+# genomes did not have to run in this run: num_trials for each pair
+# of seeds whose scores were copied (see transplant_history()).
+#
+contests_saved = 0
+#
+# transplant_history(pop, i) -- returns opponents
+#
+def transplant_history(pop, i):
+  """
+  If the i-th seed of a Population has the same genome as another
+  member or a recently replaced seed, copy that genome's scores into
+  the i-th seed's history, and set the reciprocal scores of the
+  opponents (one minus the copied score, since every trial gives out
+  one point in total). Return the addresses of the seeds that the
+  i-th seed still has to compete with, including itself.
+  """
+  global contests_saved
+  row = pop.duplicate_row(i)
+  if (row == None):
+    return list(range(len(pop)))
+  for j in row:
+    record_score(pop, i, j, row[j] / float(pop.unit))
+    record_score(pop, j, i, (pop.unit - row[j]) / float(pop.unit))
+  contests_saved += len(row) * pop.num_trials
+  return [j for j in range(len(pop)) if (j not in row)]
+#
+# update_history_all(g, pop, i, width_factor, height_factor, \
+#   time_factor, num_trials) -- returns NULL
+#
+def update_history_all(g, pop, i, width_factor, height_factor, \
+  time_factor, num_trials):
+  """
+  Put the i-th seed into the Immigration Game g with every seed in
+  the population, filling in the i-th seed's history and the i-th
+  entry of every other seed's history. With the NumPy engines, the
+  contests are grouped by toroid size and each group is run as one
+  stacked simulation. The random rotations and locations are drawn
+  in the same order as calling update_history() for each seed, so
+  the results are the same. If duplicate_genomes is True, a seed
+  with the same genome as an earlier seed only competes with the
+  seeds that the earlier seed did not meet (see transplant_history()).
+  """
+  pop_size = len(pop)
+  opponents = range(pop_size)
+  if (mparam.duplicate_genomes and isinstance(pop, mclass.Population)):
+    opponents = transplant_history(pop, i)
+  #
+  # Golly can only run one contest at a time, but a farm of Golly
+  # workers can run several.
+  #
+  if (mparam.contest_engine == "golly"):
+    update_history_pairs(g, pop, [[i, j] for j in opponents], \
+      width_factor, height_factor, time_factor, num_trials)
+    return
+  #
+  # Prepare the trials for every pair (i, j), as score_pair() would.
+  # Each item in trial_list has the form [j, s1, s2, size_key], where
+  # size_key = (g_width, g_height, g_time).
+  #
+  trial_list = []
+  placements = {} # maps size_key to a list of placements
+  for j in opponents:
+    if (i == j):
+      continue
+    s1 = copy.deepcopy(pop[i])
+    s2 = copy.deepcopy(pop[j])
+    assert s1.check_colour() == True
+    assert s2.check_colour() == True
+    assert s1.num_living > 0
+    assert s2.num_living > 0
+    if (mparam.contest_streams):
+      # draw from the pair's own stream, as score_pair_stream() does
+      stream_key = draw_stream_key(pop[i], pop[j])
+      saved_state = rand.getstate()
+      rand.seed(stream_key)
+    for trial in range(num_trials):
+      s1 = s1.random_rotate()
+      s2 = s2.random_rotate()
+      s2.red2blue()
+      size_key = tuple(dimensions(s1, s2, width_factor, height_factor, \
+        time_factor))
+      [g_width, g_height, g_time] = size_key
+      [x1, y1, x2, y2] = random_placement(s1, s2, g_width, g_height)
+      if (size_key not in placements):
+        placements[size_key] = []
+      placements[size_key].append([s1.cells, x1, y1, s2.cells, x2, y2])
+      trial_list.append([j, s1, s2, size_key])
+    if (mparam.contest_streams):
+      rand.setstate(saved_state)
+  #
+  # Run each group of toroids of the same size as one batch.
+  #
+  colours = {} # maps size_key to a list of colour counts
+  for size_key in placements:
+    [g_width, g_height, g_time] = size_key
+    colours[size_key] = meng.torus_contest_batch(placements[size_key], \
+      g_width, g_height, g_time, mparam.contest_engine, mparam.max_batch, \
+      mparam.cycle_interval)
+  #
+  # Score the trials and update the histories.
+  #
+  scores = {} # maps j to [scorei, scorej]
+  next_result = {} # maps size_key to the next unread result
+  for [j, s1, s2, size_key] in trial_list:
+    k = next_result.get(size_key, 0)
+    next_result[size_key] = k + 1
+    [red, blue, orange, green] = colours[size_key][k]
+    [points1, points2] = immigration_points(s1, s2, \
+      red, blue, orange, green)
+    [scorei, scorej] = scores.get(j, [0.0, 0.0])
+    scores[j] = [scorei + points1, scorej + points2]
+  #
+  record_score(pop, i, i, 0.5)
+  for j in scores:
+    [scorei, scorej] = scores[j]
+    record_score(pop, i, j, scorei / num_trials)
+    record_score(pop, j, i, scorej / num_trials)
   # 
   # returns NULL
   # 
@@ -521,24 +1086,56 @@ def update_history(g, pop, i, j, width_factor, height_factor, \
 def update_similarity(pop, i, j):
   """
   Calculate the similarity between the two given seeds and 
-  update their internal records with the result.
+  update their internal records with the result. A Population
+  calculates its similarities when they are needed instead (see
+  similarity_cache()).
   """
+  if (isinstance(pop, mclass.Population)):
+    return
   #
   # If i == j, the similarity score is the maximum.
   #
   if (i == j):
-    pop[i].similarities[i] = 1.0
-    return
+    sim = 1.0
+  else:
+    sim = similarity(pop[i], pop[j])
   #
-  # Calculate the similarity and update the population record.
+  # Update the population record.
   #
-  sim = similarity(pop[i], pop[j])
   pop[i].similarities[j] = sim
   pop[j].similarities[i] = sim
   # 
   # returns NULL
   # 
 #
+# update_similarity_all(pop, i) -- returns NULL
+#
+def update_similarity_all(pop, i):
+  """
+  Calculate the similarity between the i-th seed and every seed in
+  the population, as update_similarity() does for one pair, using
+  the packed bits in similarity_pairs(). A Population calculates the
+  similarities of the other seeds when they are needed instead (see
+  similarity_cache()); only the i-th seed, a new child that is about
+  to be stored (see seed_storage()), gets its own similarities,
+  rather than the copy it inherited from its parent.
+  """
+  if (isinstance(pop, mclass.Population)):
+    [addresses, similarities] = similarity_pairs(pop, i)
+    pop.set_similarities(i, addresses, similarities)
+    pop[i].similarities = np.zeros(len(pop), dtype=np.float64)
+    pop[i].similarities[addresses] = similarities
+    pop[i].similarities[i] = 1.0 # the similarity of a seed to itself
+    return
+  similarities = similarity_row(pop, i)
+  similarities[i] = 1.0 # the similarity of a seed to itself
+  for j in range(len(pop)):
+    pop[i].similarities[j] = similarities[j]
+    pop[j].similarities[i] = similarities[j]
+  # 
+  # returns NULL
+  # 
+#
 # find_top_seeds(population, sample_size) -- returns sample_pop
 #
 def find_top_seeds(population, sample_size):
@@ -548,6 +1145,9 @@ def find_top_seeds(population, sample_size):
   pop_size = len(population)
   assert pop_size >= sample_size
   assert sample_size > 0
+  # a Population keeps the fitness of each seed up to date
+  if (isinstance(population, mclass.Population)):
+    return [population[i] for i in population.top_addresses(sample_size)]
   # calculate fitness for each seed in the population, from their history
   scored_pop = []
   for i in range(pop_size):
@@ -602,6 +1202,9 @@ def find_best_seed(sample):
   """
   sample_size = len(sample)
   assert sample_size > 0
+  # a Population keeps the fitness of each seed up to date
+  if (isinstance(sample, mclass.Population)):
+    return sample[sample.best_address()]
   best_seed = sample[0]
   best_score = best_seed.fitness()
   for i in range(len(sample)):
@@ -619,6 +1222,9 @@ def find_worst_seed(sample):
   """
   sample_size = len(sample)
   assert sample_size > 0
+  # a Population keeps the fitness of each seed up to date
+  if (isinstance(sample, mclass.Population)):
+    return sample[sample.worst_address()]
   worst_seed = sample[0]
   worst_score = worst_seed.fitness()
   for i in range(len(sample)):
@@ -636,6 +1242,9 @@ def average_fitness(sample):
   """
   sample_size = len(sample)
   assert sample_size > 0
+  # a Population keeps the fitness of each seed up to date
+  if (isinstance(sample, mclass.Population)):
+    return float(np.mean(sample.fitnesses()))
   total_fitness = 0.0
   for i in range(len(sample)):
     total_fitness = total_fitness + sample[i].fitness()
@@ -652,6 +1261,12 @@ def archive_elite(population, elite_size, log_directory, log_name, run_id_number
   most fit seeds in the current population.
   """
   history_sample = find_top_seeds(population, elite_size)
+  # a Population only calculates similarities when they are needed,
+  # so calculate them for the seeds before they are stored
+  if (isinstance(population, mclass.Population)):
+    for seed in history_sample:
+      seed.similarities = similarity_row(population, seed.address)
+      seed.similarities[seed.address] = 1.0
   history_name = log_name + "-pickle-" + str(run_id_number)
   history_path = log_directory + "/" + history_name + ".bin"
   history_handle = open(history_path, "wb") # wb = write binary
@@ -739,6 +1354,91 @@ def similarity(seed0, seed1):
   # Return the degree of similarity between the two seeds.
   return similarity
 #
+# The number of one bits in each possible byte, for counting the bits
+# in packed bit arrays.
+#
+popcount_table = np.array([bin(byte).count("1") for byte in range(256)], \
+  dtype=np.int64)
+#
+# similarity_row(pop, i) -- returns similarities
+#
+def similarity_row(pop, i):
+  """
+  Measure the similarity of the i-th seed to every seed in the
+  population, giving the same values as similarity(), as an array
+  in order of address (see similarity_pairs()).
+  """
+  similarities = np.zeros(len(pop), dtype=np.float64)
+  [addresses, bucket_similarities] = similarity_pairs(pop, i)
+  similarities[addresses] = bucket_similarities
+  return similarities
+#
+# similarity_pairs(pop, i) -- returns [addresses, similarities]
+#
+def similarity_pairs(pop, i):
+  """
+  Measure the similarity of the i-th seed to the seeds that might be
+  similar to it, giving the same values as similarity(); the
+  similarity to all other seeds is zero. For a Population, these are
+  the seeds in the same bucket (the same shape and purple mask); for
+  a list, they are the seeds with the same shape. Each seed is
+  encoded as packed bits (see Seed.pack_bits()), and the seeds are
+  compared all at once: two seeds have the same borders when the XOR
+  of their purple masks is zero, and then the cells that disagree are
+  the one bits in the XOR of their live planes.
+  """
+  seed0 = pop[i]
+  if (isinstance(pop, mclass.Population)):
+    bits = pop.bits
+    candidates = pop.bucket(i)
+  else:
+    bits = [seed.pack_bits() for seed in pop]
+    candidates = [j for j in range(len(pop)) if \
+      ((pop[j].xspan == seed0.xspan) and (pop[j].yspan == seed0.yspan))]
+  #
+  # seeds with other states are compared cell by cell
+  #
+  if (bits[i] == None):
+    return [candidates, [similarity(seed0, pop[j]) for j in candidates]]
+  addresses = []
+  similarities = []
+  packed = []
+  for j in candidates:
+    if (bits[j] == None):
+      addresses.append(j)
+      similarities.append(similarity(seed0, pop[j]))
+    else:
+      packed.append(j)
+  if (len(packed) == 0):
+    return [addresses, similarities]
+  #
+  # compare the packed seeds all at once
+  #
+  [live0, purple0] = bits[i]
+  live = np.stack([bits[j][0] for j in packed])
+  purple = np.stack([bits[j][1] for j in packed])
+  same_borders = ~ np.any(purple != purple0, axis=1)
+  num_disagree = popcount_table[live ^ live0].sum(axis=1)
+  area = seed0.xspan * seed0.yspan
+  packed_similarities = np.where(same_borders, \
+    (area - num_disagree) / area, 0.0)
+  return [addresses + packed, similarities + packed_similarities.tolist()]
+#
+# similarity_cache(pop, i) -- returns similar
+#
+def similarity_cache(pop, i):
+  """
+  Return the similarities of the i-th seed in a Population to the
+  seeds in its bucket, as a dictionary from address to similarity
+  that leaves out the zeros. The similarities are calculated the
+  first time they are asked for and kept until a seed in the bucket
+  is replaced.
+  """
+  if (pop.similar[i] == None):
+    [addresses, similarities] = similarity_pairs(pop, i)
+    pop.set_similarities(i, addresses, similarities)
+  return pop.similar[i]
+#
 # find_similar_seeds(target_seed, pop, min_similarity, max_similarity)
 # -- returns similar_seeds
 # 
@@ -746,13 +1446,28 @@ def find_similar_seeds(target_seed, pop, min_similarity, max_similarity):
   """
   Given a target seed, find seeds in the population with similarities
   to the target in the range from min_similarity to max_similarity.
-  This function assumes that target_seed is in the population and
-  the list target_seed.similarities is up-to-date. 
-  """
+  This function assumes that target_seed is in the population and,
+  unless the population is a Population, that the list
+  target_seed.similarities is up-to-date. 
+  """
+  #
+  # In a Population, only the seeds in the target's bucket can have
+  # a similarity above zero.
+  #
+  if (isinstance(pop, mclass.Population) and (min_similarity > 0.0)):
+    similar = similarity_cache(pop, target_seed.address)
+    return [pop[i] for i in sorted(similar) if \
+      ((similar[i] >= min_similarity) and (similar[i] <= max_similarity) \
+      and (target_seed.address != i))]
+  if (isinstance(pop, mclass.Population)):
+    similarities = similarity_row(pop, target_seed.address)
+    similarities[target_seed.address] = 1.0
+  else:
+    similarities = target_seed.similarities
   similar_seeds = []
   for i in range(len(pop)):
-    if ((target_seed.similarities[i] >= min_similarity) and \
-      (target_seed.similarities[i] <= max_similarity) and \
+    if ((similarities[i] >= min_similarity) and \
+      (similarities[i] <= max_similarity) and \
       (target_seed.address != i)):
       similar_seeds.append(pop[i])
   # return the seeds that satisfy the conditions
@@ -1023,11 +1738,9 @@ def uniform_asexual(candidate_seed, pop, n, next_unique_ID_number):
   height_factor = mparam.height_factor
   time_factor = mparam.time_factor
   num_trials = mparam.num_trials
-  pop_size = len(pop)
-  for j in range(pop_size):
-    update_history(g, pop, i, j, width_factor, height_factor, \
-      time_factor, num_trials)
-    update_similarity(pop, i, j)
+  update_history_all(g, pop, i, width_factor, height_factor, \
+    time_factor, num_trials)
+  update_similarity_all(pop, i)
   # store the new seed
   seed_storage(s1)
   # Report on the new history of the new seed
@@ -1098,11 +1811,9 @@ def variable_asexual(candidate_seed, pop, n, max_seed_area,
   height_factor = mparam.height_factor
   time_factor = mparam.time_factor
   num_trials = mparam.num_trials
-  pop_size = len(pop)
-  for j in range(pop_size):
-    update_history(g, pop, i, j, width_factor, height_factor, \
-      time_factor, num_trials)
-    update_similarity(pop, i, j)
+  update_history_all(g, pop, i, width_factor, height_factor, \
+    time_factor, num_trials)
+  update_similarity_all(pop, i)
   # store the new seed
   seed_storage(s1)
   # Report on the new history of the new seed
@@ -1187,11 +1898,9 @@ def sexual(candidate_seed, pop, n, max_seed_area, next_unique_ID_number):
   height_factor = mparam.height_factor
   time_factor = mparam.time_factor
   num_trials = mparam.num_trials
-  pop_size = len(pop)
-  for j in range(pop_size):
-    update_history(g, pop, i, j, width_factor, height_factor, \
-      time_factor, num_trials)
-    update_similarity(pop, i, j)
+  update_history_all(g, pop, i, width_factor, height_factor, \
+    time_factor, num_trials)
+  update_similarity_all(pop, i)
   # store the new seed
   seed_storage(s3)
   # Report on the new history of the new seed
@@ -1308,10 +2017,9 @@ def fusion(candidate_seed, pop, n, max_seed_area, next_unique_ID_number):
   height_factor = mparam.height_factor
   time_factor = mparam.time_factor
   num_trials = mparam.num_trials
-  for j in range(pop_size):
-    update_history(g, pop, i, j, width_factor, height_factor, \
-      time_factor, num_trials)
-    update_similarity(pop, i, j)
+  update_history_all(g, pop, i, width_factor, height_factor, \
+    time_factor, num_trials)
+  update_similarity_all(pop, i)
   # If the flag immediate_symbiosis_flag is set to "1", then
   # we must test to see whether s4 is more fit than both s1 and s2.
   if (mparam.immediate_symbiosis_flag == 1):
@@ -1454,11 +2162,9 @@ def fission(candidate_seed, pop, n, max_seed_area, next_unique_ID_number):
   height_factor = mparam.height_factor
   time_factor = mparam.time_factor
   num_trials = mparam.num_trials
-  pop_size = len(pop)
-  for j in range(pop_size):
-    update_history(g, pop, i, j, width_factor, height_factor, \
-      time_factor, num_trials)
-    update_similarity(pop, i, j)
+  update_history_all(g, pop, i, width_factor, height_factor, \
+    time_factor, num_trials)
+  update_similarity_all(pop, i)
   # store the new seed
   seed_storage(s1)
   # Report on the new history of the new seed
@@ -1889,6 +2595,11 @@ def snap_photo(g, file_path, rule_name, seed, \
   The photo will be stored in file_path (*.png).
   """
   #
+  # pyautogui is only needed for photos, so import it here, which
+  # lets the other functions run on machines without a screen.
+  #
+  import pyautogui # tool for taking photos of the screen
+  #
   # Prevent Windows Screen Lock, which results in blank photos.
   #
   pyautogui.press('volumedown')
@@ -1903,10 +2614,7 @@ def snap_photo(g, file_path, rule_name, seed, \
   #
   # Copy the seed into Golly.
   #
-  for x in range(seed.xspan):
-    for y in range(seed.yspan):
-      state = seed.cells[x][y]
-      g.setcell(x, y, state)
+  g.putcells(seed.cell_list(0, 0, g.numstates() > 2))
   #
   # Run the game for num_steps steps.
   #
@@ -1931,6 +2639,111 @@ def snap_photo(g, file_path, rule_name, seed, \
   #
   return
 #
+# live_cell_list(seed) -- returns cell_list
+#
+def live_cell_list(seed):
+  """
+  Convert a Management Game seed into a Golly multi-state cell list
+  with its corner at (0, 0), leaving out the purple cells (state 5),
+  which the analysis functions ignore.
+  """
+  live_seed = copy.deepcopy(seed)
+  live_seed.cells = np.where(seed.cells < 5, seed.cells, 0)
+  return live_seed.cell_list(0, 0, True)
+#
+# plane_start(seed, rule_name) -- returns plane
+#
+def plane_start(seed, rule_name):
+  """
+  Copy a seed onto an infinite plane in the engine given by
+  analysis_engine in model_parameters.py, for the given rule
+  ("Life" or "Management"). Purple cells (state 5) are ignored,
+  as when a Management seed is copied into Golly. The plane is a
+  node for "hashlife" (model_hashlife.py) and a grid for "numpy"
+  (model_engine.py).
+  """
+  plane_cells = np.where(seed.cells < 5, seed.cells, 0)
+  if (mparam.analysis_engine == "hashlife"):
+    # a Life pattern runs the same as a red Management pattern
+    return mhash.make_pattern(plane_cells)
+  assert mparam.analysis_engine == "numpy"
+  return meng.make_plane(plane_cells)
+#
+# plane_advance(plane, num_steps, rule_name) -- returns plane
+#
+def plane_advance(plane, num_steps, rule_name):
+  """
+  Run the given plane (from plane_start()) for num_steps steps.
+  """
+  if (mparam.analysis_engine == "hashlife"):
+    return mhash.advance(plane, num_steps)
+  assert mparam.analysis_engine == "numpy"
+  return meng.run_plane(plane, num_steps, rule_name)
+#
+# plane_counts(plane) -- returns [white, red, blue, orange, green, purple]
+#
+def plane_counts(plane):
+  """
+  Count the cells in each state on the given plane (from
+  plane_start()). White is reported as zero, as with the cell
+  lists from Golly. For the Game of Life, the population is the
+  count in position 1.
+  """
+  if (mparam.analysis_engine == "hashlife"):
+    return mhash.state_counts(plane)
+  assert mparam.analysis_engine == "numpy"
+  return meng.plane_counts(plane)
+#
+# population_trace(g, seed, rule_name, num_steps, interval) -- returns trace
+#
+def population_trace(g, seed, rule_name, num_steps, interval):
+  """
+  Run a seed on an infinite plane for num_steps steps with the given
+  rule ("Life" or "Management"), in the engine given by
+  analysis_engine in model_parameters.py, and count the cells in each
+  state every interval steps. Returns an array trace[k][state], with
+  the counts [white, red, blue, orange, green, purple] after
+  k * interval steps, for k from 0 to num_steps / interval. As in
+  plane_counts(), white is reported as zero, purple cells in the seed
+  are ignored, and for the Game of Life, the population is in
+  position 1. The counts are gathered inside the stepping loop, so
+  the caller makes one call instead of one call per step.
+  """
+  assert num_steps % interval == 0
+  if (mparam.analysis_engine == "hashlife"):
+    return mhash.trace(plane_start(seed, rule_name), num_steps, interval)
+  if (mparam.analysis_engine == "numpy"):
+    return meng.trace_plane(plane_start(seed, rule_name), num_steps, \
+      interval, rule_name)
+  assert mparam.analysis_engine == "golly"
+  g.setalgo("QuickLife")
+  g.autoupdate(False)
+  g.new(rule_name)
+  g.setrule(rule_name) # make an infinite plane
+  if (rule_name == "Life"):
+    # state 0 = white, state 1 = black
+    g.setcolors([0,255,255,255,1,0,0,0])
+    g.putcells(seed.cell_list(0, 0, False))
+  else:
+    g.putcells(live_cell_list(seed))
+  trace = np.zeros((num_steps // interval + 1, meng.num_states), \
+    dtype=np.int64)
+  for k in range(len(trace)):
+    if (k > 0):
+      g.run(interval)
+    # one bulk fetch of the cells for each sample
+    cell_list = g.getcells(g.getrect())
+    if (g.numstates() == 2):
+      trace[k][1] = len(cell_list) // 2
+    else:
+      num_cells = len(cell_list) // 3
+      states = np.array(cell_list[0:(3 * num_cells)], dtype=np.int64)[2::3]
+      trace[k][1:] = np.bincount(states, \
+        minlength=meng.num_states)[1:meng.num_states]
+  if (not mparam.headless_mode):
+    g.update() # show the end state
+  return trace
+#
 # measure_growth_life(g, seed, num_steps) -- return growth
 #
 def measure_growth_life(g, seed, num_steps):
@@ -1938,15 +2751,21 @@ def measure_growth_life(g, seed, num_steps):
   Given a Game of Life seed pattern (two states only, 0 and 1),
   run the pattern for num_steps and calculate its growth.
   """
+  if (mparam.analysis_engine != "golly"):
+    # run the seed in one of the plane engines (see plane_start())
+    plane = plane_start(seed, "Life")
+    start_size = plane_counts(plane)[1]
+    plane = plane_advance(plane, num_steps, "Life")
+    end_size = plane_counts(plane)[1]
+    growth = end_size - start_size
+    return growth
   g.setalgo("QuickLife")
   g.autoupdate(False)
   g.new("Life")
   g.setrule("Life")
   # state 0 = white, state 1 = black
   g.setcolors([0,255,255,255,1,0,0,0])
-  for x in range(seed.xspan):
-    for y in range(seed.yspan):
-      g.setcell(x, y, seed.cells[x][y])
+  g.putcells(seed.cell_list(0, 0, False))
   g.update()
   start_size = int(g.getpop())
   g.run(num_steps)
@@ -2017,47 +2836,60 @@ def measure_growth_management(g, seed, num_steps):
         # state 5 -- purple -- the border between regions
         elif (seed_map[x][y] == -1):
           assert seed_colouring.cells[x][y] == 5
-    # initialize Golly
-    rule_name = "Management" # the Management Game
-    g.setalgo("QuickLife") # use "HashLife" or "QuickLife"
-    g.autoupdate(False) # do not update the view unless requested
-    g.new(rule_name) # initialize cells to state 0
-    g.setrule(rule_name) # make an infinite plane
     # initialize the counts for the five states:
     # [white (0), red (1), blue (2), orange (3), green (4)]
     num_colours = 5
     start_size = [0, 0, 0, 0, 0] 
     end_size = [0, 0, 0, 0, 0]
-    # copy seed into Golly 
-    for x in range(num_rows):
-      for y in range(num_cols):
-        state = seed_colouring.cells[x][y]
-        # ignore purple colours (state 5)
-        if (state < 5):
-          g.setcell(x, y, state)
-          # update start_size
-          start_size[state] += 1
-    # run for the requested number of steps
-    g.run(num_steps)
-    g.update()
-    # update end_size
-    boundary = g.getrect()
-    if (len(boundary) == 0): # if no live cells ...
-      end_size = [0, 0, 0, 0, 0]
+    if (mparam.analysis_engine != "golly"):
+      # run the seed in one of the plane engines (see plane_start())
+      for x in range(num_rows):
+        for y in range(num_cols):
+          state = seed_colouring.cells[x][y]
+          # ignore purple colours (state 5)
+          if (state < 5):
+            # update start_size
+            start_size[state] += 1
+      plane = plane_start(seed_colouring, "Management")
+      plane = plane_advance(plane, num_steps, "Management")
+      end_size = plane_counts(plane)[0:num_colours]
     else:
-      cell_list = g.getcells(boundary)
-      # if cell_list ends in 0, then delete the 0 -- note that stateN
-      # will never be zero, since dead cells (state 0) are not included
-      # in cell_list
-      if (cell_list[-1] == 0):
-        cell_list.pop()
-      # end_size = [white (0), red (1), blue (2), orange (3), green (4)]
-      end_size = [0, 0, 0, 0, 0] # initialize
-      for (x, y, state) in zip(*[iter(cell_list)] * 3):
-        # ignore purple colours (state 5)
-        if (state < 5):
-          # update count
-          end_size[state] += 1
+      # initialize Golly
+      rule_name = "Management" # the Management Game
+      g.setalgo("QuickLife") # use "HashLife" or "QuickLife"
+      g.autoupdate(False) # do not update the view unless requested
+      g.new(rule_name) # initialize cells to state 0
+      g.setrule(rule_name) # make an infinite plane
+      # copy seed into Golly 
+      for x in range(num_rows):
+        for y in range(num_cols):
+          state = seed_colouring.cells[x][y]
+          # ignore purple colours (state 5)
+          if (state < 5):
+            # update start_size
+            start_size[state] += 1
+      g.putcells(live_cell_list(seed_colouring))
+      # run for the requested number of steps
+      g.run(num_steps)
+      g.update()
+      # update end_size
+      boundary = g.getrect()
+      if (len(boundary) == 0): # if no live cells ...
+        end_size = [0, 0, 0, 0, 0]
+      else:
+        cell_list = g.getcells(boundary)
+        # if cell_list ends in 0, then delete the 0 -- note that stateN
+        # will never be zero, since dead cells (state 0) are not included
+        # in cell_list
+        if (cell_list[-1] == 0):
+          cell_list.pop()
+        # end_size = [white (0), red (1), blue (2), orange (3), green (4)]
+        end_size = [0, 0, 0, 0, 0] # initialize
+        for (x, y, state) in zip(*[iter(cell_list)] * 3):
+          # ignore purple colours (state 5)
+          if (state < 5):
+            # update count
+            end_size[state] += 1
     # calculate growth
     growth_vector = []
     for colour_num in range(num_colours):
@@ -2250,25 +3082,11 @@ def measure_consistent_growth(g, seed, test_num_steps):
   run the pattern for num_steps and calculate a score that
   rewards early consistent growth.
   """
-  g.setalgo("QuickLife")
-  g.autoupdate(False)
-  g.new("Life")
-  g.setrule("Life")
-  # state 0 = white, state 1 = black
-  g.setcolors([0,255,255,255,1,0,0,0])
-  for x in range(seed.xspan):
-    for y in range(seed.yspan):
-      g.setcell(x, y, seed.cells[x][y])
-  g.update()
-  size_before = int(g.getpop())
-  delta_positive = 0
-  for step in range(test_num_steps):
-    g.run(1)
-    g.update()
-    size_after = int(g.getpop())
-    if (size_after > size_before):
-      delta_positive += 1
-    size_before = size_after
+  #
+  # one call for the population at every step (see population_trace())
+  #
+  sizes = population_trace(g, seed, "Life", test_num_steps, 1)[:, 1]
+  delta_positive = int(np.count_nonzero(sizes[1:] > sizes[:-1]))
   return delta_positive / test_num_steps
 #
 # hash_seed(seed) -- returns a hash key for seed
@@ -2447,59 +3265,27 @@ def growth_tensor(g, seed_list, step_size, max_seeds, num_steps,
           # state 5 -- purple -- the border between regions
           elif (seed_map[x][y] == -1):
             assert seed_colouring.cells[x][y] == 5
-      # initialize Golly
-      rule_name = "Management" # the Management Game
-      g.setalgo("QuickLife") # use "HashLife" or "QuickLife"
-      g.autoupdate(False) # do not update the view unless requested
-      g.new(rule_name) # initialize cells to state 0
-      g.setrule(rule_name) # make an infinite plane
       # initialize the counts for the five states:
       # [white, red, blue, orange, green]
       start_size = [0, 0, 0, 0, 0] 
-      end_size = [0, 0, 0, 0, 0]
-      # copy seed into Golly 
       for x in range(num_rows):
         for y in range(num_cols):
           state = seed_colouring.cells[x][y]
           # ignore purple colours (state 5)
           if (state < 5):
-            g.setcell(x, y, state)
-            # update start_size and end_size
             start_size[state] += 1
-            end_size[state] += 1
-      # record the initial growth (time step 0) in the tensor
-      # -- the intitial growth is necessarily zero for all colours
-      step_num = 0
+      # run the seed once, counting the colours every step_size steps
+      # from step 0 to step num_steps - 1 (see population_trace())
+      trace = population_trace(g, seed_colouring, "Management", \
+        num_steps - 1, step_size)
+      # update the tensor with the growth of each colour
       part_num = target_region - 1
       for colour_num in range(num_colours):
-        tensor[seed_num, step_num, colour_num, part_num] = 0
-      # iterate over the number of time steps -- we start the iteration
-      # at step_size, because we already filled the tensor for step 0,
-      # immediately above
-      for step_num in range(step_size, num_steps, step_size):
-        g.run(step_size)
-        g.update()
-        # update end_size
-        boundary = g.getrect()
-        if (len(boundary) == 0): # if no live cells ...
-          end_size = [0, 0, 0, 0, 0]
-        else:
-          cell_list = g.getcells(boundary)
-          # if cell_list ends in 0, then delete the 0 -- note that stateN
-          # will never be zero, since dead cells (state 0) are not included
-          # in cell_list
-          if (cell_list[-1] == 0):
-            cell_list.pop()
-          # end_size = [white, red, blue, orange, green]
-          end_size = [0, 0, 0, 0, 0] # initialize
-          for (x, y, state) in zip(*[iter(cell_list)] * 3):
-            end_size[state] += 1 # update count
-        # update the tensor
-        part_num = target_region - 1
-        for colour_num in range(num_colours):
-          tensor[seed_num, step_num, colour_num, part_num] = \
-            end_size[colour_num] - start_size[colour_num]
-        #       
+        tensor[seed_num, 0:num_steps:step_size, colour_num, part_num] = \
+          trace[:, colour_num] - start_size[colour_num]
+      # the initial growth (time step 0) is necessarily zero for all
+      # colours
+      tensor[seed_num, 0, :, part_num] = 0
       #
     # increment fusion number (seed number), so we're ready for the
     # next trip around the loop
@@ -0,0 +1,296 @@
+"""
+Model HashLife
+
+A quadtree engine (HashLife) for running the Management Game on an
+infinite plane, for the long runs in the analysis functions.
+"""
+import numpy as np
+import model_engine as meng
+"""
+Quadtree nodes
+"""
+#
+# Note: a pattern is stored as a quadtree. A node of level k is a
+# square of 2^k x 2^k cells, made of four children of level k - 1:
+#
+#   a = top left      b = top right
+#   c = bottom left   d = bottom right
+#
+# A node of level 0 is a single cell in one of the six states of
+# the Management Game (see model_engine.py). Nodes are canonical:
+# there is only one node for any given square of cells, so equal
+# squares are the same Python object. This lets us remember the
+# future of every node we have seen, across all the patterns we run,
+# and reuse it whenever the same square turns up again.
+#
+# Life patterns (states 0 and 1 only) can also be run here, since a
+# pattern of red cells in the Management Game behaves exactly like
+# the same pattern in the Game of Life.
+#
+class Node:
+  """
+  A square of cells in the quadtree. Each node records the number of
+  cells in each state (pops[state], for states 1 to 5) and the total
+  number of cells that are not white (n).
+  """
+  __slots__ = ["k", "a", "b", "c", "d", "pops", "n", "state"]
+  #
+  # __init__(self, k, a, b, c, d, pops, state) -- returns NULL
+  #
+  def __init__(self, k, a, b, c, d, pops, state):
+    """
+    Make a new node. Use join() for nodes of level 1 or more, so that
+    the nodes stay canonical.
+    """
+    self.k = k # level: the node is 2^k x 2^k cells
+    self.a = a # top left child
+    self.b = b # top right child
+    self.c = c # bottom left child
+    self.d = d # bottom right child
+    self.pops = pops # counts of states 0 to 5 (pops[0] is unused)
+    self.n = sum(pops) # count of cells that are not white
+    self.state = state # the state of a level 0 node, else None
+#
+# The six leaves, one for each state.
+#
+leaves = []
+for state in range(meng.num_states):
+  leaf_pops = [0] * meng.num_states
+  if (state > 0):
+    leaf_pops[state] = 1
+  leaves.append(Node(0, None, None, None, None, tuple(leaf_pops), state))
+#
+# Tables for canonical nodes, empty nodes, and remembered futures.
+# When the node table grows beyond max_nodes, all three tables are
+# cleared before the next pattern is built.
+#
+node_table = {} # maps (a, b, c, d) to the canonical node
+empty_table = {} # maps k to the empty node of level k
+future_table = {} # maps (node, j) to the centre of node after 2^j steps
+max_nodes = 2000000
+#
+# The rule for single cells: the lookup table compiled from
+# Management.rule, as nested lists, for fast access from Python.
+#
+rule_table = meng.load_rule_table("Management").tolist()
+state_weights = [0] + [9 ** (state - 1) for state in range(1, meng.num_states)]
+#
+# join(a, b, c, d) -- returns node
+#
+def join(a, b, c, d):
+  """
+  Return the canonical node with the four given children.
+  """
+  key = (a, b, c, d)
+  node = node_table.get(key)
+  if (node is None):
+    pops = tuple([a.pops[s] + b.pops[s] + c.pops[s] + d.pops[s] \
+      for s in range(meng.num_states)])
+    node = Node(a.k + 1, a, b, c, d, pops, None)
+    node_table[key] = node
+  return node
+#
+# empty(k) -- returns node
+#
+def empty(k):
+  """
+  Return the empty (all white) node of level k.
+  """
+  node = empty_table.get(k)
+  if (node is None):
+    if (k == 0):
+      node = leaves[0]
+    else:
+      child = empty(k - 1)
+      node = join(child, child, child, child)
+    empty_table[k] = node
+  return node
+#
+# clear_tables() -- returns NULL
+#
+def clear_tables():
+  """
+  Forget all nodes and futures, to free memory.
+  """
+  node_table.clear()
+  empty_table.clear()
+  future_table.clear()
+#
+# make_node(cells) -- returns node
+#
+def make_node(cells):
+  """
+  Given a square matrix of states whose side is a power of two,
+  return the canonical node for it. The matrix is indexed as
+  cells[x][y], like the seeds in model_classes.py.
+  """
+  size = cells.shape[0]
+  if (size == 1):
+    return leaves[int(cells[0][0])]
+  if not cells.any():
+    return empty(size.bit_length() - 1)
+  half = size // 2
+  return join(make_node(cells[:half, :half]), make_node(cells[half:, :half]), \
+    make_node(cells[:half, half:]), make_node(cells[half:, half:]))
+#
+# make_pattern(cells) -- returns node
+#
+def make_pattern(cells):
+  """
+  Given a matrix of states, indexed as cells[x][y], return a node
+  holding the matrix on an otherwise empty plane.
+  """
+  if (len(node_table) > max_nodes):
+    clear_tables()
+  (xspan, yspan) = cells.shape
+  size = 1
+  while (size < max(xspan, yspan)):
+    size *= 2
+  square = np.zeros((size, size), dtype=np.uint8)
+  square[:xspan, :yspan] = cells
+  return make_node(square)
+#
+# centre(node) -- returns node
+#
+def centre(node):
+  """
+  Return a node one level larger, with the given node in its centre
+  and white cells around it.
+  """
+  z = empty(node.k - 1)
+  return join(join(z, z, z, node.a), join(z, z, node.b, z), \
+    join(z, node.c, z, z), join(node.d, z, z, z))
+#
+# is_padded(node) -- returns True or False
+#
+def is_padded(node):
+  """
+  Decide whether all of the cells that are not white lie in the
+  central quarter of the node (the middle half in each direction).
+  """
+  return (node.k >= 2) and \
+    (node.n == node.a.d.n + node.b.c.n + node.c.b.n + node.d.a.n)
+#
+# step_square(node) -- returns node
+#
+def step_square(node):
+  """
+  Given a node of level 2 (4 x 4 cells), return the node of level 1
+  for the central 2 x 2 cells, one step later.
+  """
+  # read the 4 x 4 cells as m[x][y]
+  m = [[0] * 4 for x in range(4)]
+  for (child, dx, dy) in [(node.a, 0, 0), (node.b, 2, 0), \
+    (node.c, 0, 2), (node.d, 2, 2)]:
+    m[dx][dy] = child.a.state
+    m[dx + 1][dy] = child.b.state
+    m[dx][dy + 1] = child.c.state
+    m[dx + 1][dy + 1] = child.d.state
+  # step each of the central cells with the rule table
+  new_cells = []
+  for (x, y) in [(1, 1), (2, 1), (1, 2), (2, 2)]:
+    key = 0
+    for dx in [-1, 0, 1]:
+      for dy in [-1, 0, 1]:
+        if ((dx != 0) or (dy != 0)):
+          key += state_weights[m[x + dx][y + dy]]
+    new_cells.append(leaves[rule_table[m[x][y]][key]])
+  return join(new_cells[0], new_cells[1], new_cells[2], new_cells[3])
+#
+# future(node, j) -- returns node
+#
+def future(node, j):
+  """
+  Given a node of level k >= 2, return the node of level k - 1 at its
+  centre, 2^j steps later, where j <= k - 2. Signals move at most one
+  cell per step, so the centre only depends on the cells inside the
+  node. The results are remembered in future_table.
+  """
+  key = (node, j)
+  result = future_table.get(key)
+  if (result is not None):
+    return result
+  if (node.n == 0):
+    # white cells stay white
+    result = empty(node.k - 1)
+  elif (node.k == 2):
+    result = step_square(node)
+  else:
+    (a, b, c, d) = (node.a, node.b, node.c, node.d)
+    # nine overlapping squares of level k - 1, each 2^(k - 2) steps
+    # or 2^j steps later, whichever is smaller
+    i = min(j, node.k - 3)
+    c1 = future(a, i)
+    c2 = future(join(a.b, b.a, a.d, b.c), i)
+    c3 = future(b, i)
+    c4 = future(join(a.c, a.d, c.a, c.b), i)
+    c5 = future(join(a.d, b.c, c.b, d.a), i)
+    c6 = future(join(b.c, b.d, d.a, d.b), i)
+    c7 = future(c, i)
+    c8 = future(join(c.b, d.a, c.d, d.c), i)
+    c9 = future(d, i)
+    if (j < node.k - 2):
+      # the nine squares have already gone 2^j steps, so take the
+      # centre without running any further
+      result = join(join(c1.d, c2.c, c4.b, c5.a), \
+        join(c2.d, c3.c, c5.b, c6.a), \
+        join(c4.d, c5.c, c7.b, c8.a), \
+        join(c5.d, c6.c, c8.b, c9.a))
+    else:
+      # run the four overlapping squares for another 2^(k - 3) steps
+      result = join(future(join(c1, c2, c4, c5), i), \
+        future(join(c2, c3, c5, c6), i), \
+        future(join(c4, c5, c7, c8), i), \
+        future(join(c5, c6, c8, c9), i))
+  future_table[key] = result
+  return result
+#
+# advance(node, num_steps) -- returns node
+#
+def advance(node, num_steps):
+  """
+  Run the pattern in the given node for num_steps steps on an
+  infinite plane, jumping ahead by powers of two, and return a node
+  that holds the whole pattern at the end.
+  """
+  j = 0
+  while (num_steps > 0):
+    if (num_steps & (1 << j)):
+      # make sure there is room for the pattern to grow for 2^j steps
+      while ((node.k < j + 2) or (not is_padded(node))):
+        node = centre(node)
+      node = future(centre(node), j)
+      num_steps -= (1 << j)
+    j += 1
+  return node
+#
+# state_counts(node) -- returns [white, red, blue, orange, green, purple]
+#
+def state_counts(node):
+  """
+  Count the number of cells in each state, except white, which is
+  unbounded on the infinite plane and is reported as zero, like
+  the counts from g.getcells() in Golly.
+  """
+  return [0] + list(node.pops[1:])
+#
+# trace(node, num_steps, interval) -- returns trace
+#
+def trace(node, num_steps, interval):
+  """
+  Run the pattern in the given node for num_steps steps and count the
+  cells in each state every interval steps. Returns an array
+  trace[k][state] with the counts (as in state_counts()) after
+  k * interval steps, for k from 0 to num_steps / interval.
+  """
+  assert num_steps % interval == 0
+  trace = np.zeros((num_steps // interval + 1, meng.num_states), \
+    dtype=np.int64)
+  trace[0] = state_counts(node)
+  for k in range(1, len(trace)):
+    node = advance(node, interval)
+    trace[k] = state_counts(node)
+  return trace
+#
+#
+#
@@ -107,6 +107,170 @@ height_factor = 3.0
 #
 time_factor = 6.0
 #
+# The engine for running contests between pairs of seeds in
+# score_pair() and score_management():
+#
+# "golly"    = run the contests in Golly (QuickLife), one call at a time
+# "numpy"    = run the contests in the NumPy engine (model_engine.py)
+# "bitplane" = run the contests in the bit-sliced NumPy engine, which
+#              packs 64 cells into each machine word; it is meant for
+#              batched runs (see max_batch), and is slower than "numpy"
+#              for single contests
+# "table"    = run the contests with a lookup table compiled from
+#              Management.rule, one fancy-indexing step per generation
+# "tiled"    = run the contests in the tiled NumPy engine, which only
+#              recomputes the parts of the toroid near recent changes
+# "threaded" = run the contests in the threaded NumPy engine, which
+#              steps strips of one toroid on several cores at once
+#
+# All engines give the same counts for the same random placement
+# of the seeds; the NumPy engines do not need a Golly process.
+#
+contest_engine = "golly"
+#
+assert contest_engine in ["golly", "numpy", "bitplane", "table", \
+  "tiled", "threaded"]
+#
+# Most contests settle into still lifes and oscillators long before
+# g_time. Every cycle_interval steps, check whether the toroid has
+# returned to an earlier state; if so, skip ahead to the final state
+# directly. The scores are the same as for a full run. Use 0 to run
+# every contest for the full g_time steps.
+#
+cycle_interval = 16
+#
+assert cycle_interval >= 0
+#
+# With the NumPy engines, when a new child is born, its contests with
+# the whole population are grouped by toroid size and each group is
+# run as one stacked simulation. The maximum number of toroids that
+# are stacked together is max_batch.
+#
+max_batch = 256
+#
+# With the "golly" engine, keep up to golly_layers Golly layers, one
+# for each recently used torus size, and reuse them across trials
+# instead of setting up a new universe for every trial. The scores
+# are the same either way, but the extra layers stay open in Golly.
+# Use 0 to set up a new universe for every trial, as before.
+#
+golly_layers = 0
+#
+assert golly_layers >= 0
+#
+# The Golly algorithm for contests with the "golly" engine:
+#
+# "QuickLife" = the fastest algorithm for small toroids and short runs
+# "HashLife"  = the fastest algorithm for large toroids and long runs
+# "auto"      = for each contest, use the algorithm that was fastest
+#               for the nearest toroid size and number of steps in the
+#               cost model written by calibrate_algos.py to
+#               algo_model_path (QuickLife, if there is no cost model)
+#
+golly_algo = "QuickLife"
+#
+assert golly_algo in ["QuickLife", "HashLife", "auto"]
+#
+algo_model_path = log_directory + "/golly-algos.tsv"
+#
+# A farm of Golly workers, for running contests with the "golly"
+# engine on several cores of one machine (see model_farm.py):
+#
+# "off"        = run the contests in this Golly instance
+# "golly"      = send the contests to Golly instances that are running
+#                farm_worker.py, through the job directory farm_directory
+# "in_process" = send the contests through farm_directory, but run them
+#                in this process, as a fake worker (for testing)
+#
+# The farm is only used with the "golly" engine. The NumPy engines
+# run the contests of each new child locally, as one batch, so a
+# farm would only score the initial population, in different random
+# streams from the rest of the run.
+#
+farm_mode = "off"
+#
+assert farm_mode in ["off", "golly", "in_process"]
+assert (farm_mode == "off") or (contest_engine == "golly")
+#
+farm_directory = log_directory + "/farm"
+#
+# A job that a worker claimed more than farm_timeout seconds ago
+# without writing its result is put back in the job directory, so
+# that another worker can run it; for example, when a Golly worker
+# crashed or was closed in the middle of a job.
+#
+farm_timeout = 600.0
+#
+assert farm_timeout > 0.0
+#
+# Contest corpus: with the "golly" engine, record every
+# corpus_interval-th contest (the rotated seeds, their locations, the
+# size of the toroid, the numbers of steps, and the colour counts
+# from Golly) in corpus_path, for replay_corpus.py. Use 0 to record
+# nothing.
+#
+corpus_interval = 0
+#
+assert corpus_interval >= 0
+#
+corpus_path = log_directory + "/contest-corpus.bin"
+#
+# Contest streams: if contest_streams is True, the contests between
+# each pair of seeds in update_history() and update_history_all()
+# draw their random rotations and locations from their own stream,
+# seeded with a stream key that is drawn from the main random number
+# generator. The unique IDs of the two seeds and the stream key are
+# appended to stream_log_path, so that any one contest can be run
+# again on its own with replay_stream.py.
+#
+contest_streams = False
+#
+stream_log_path = log_directory + "/contest-streams.tsv"
+#
+# Duplicate genomes: a child often has exactly the same cells as a
+# member of the population, or as a seed that was recently removed
+# from the population. If duplicate_genomes is True, such a child
+# takes its scores from the earlier copy of its genome, instead of
+# competing again with every member of the population; only the
+# contests against members that the earlier copy never met are run
+# (see transplant_history() in model_functions.py). The scores of the
+# last duplicate_memory seeds removed from the population are kept
+# for this purpose. If duplicate_orientation is True, a rotated or
+# flipped copy of a genome also counts as a duplicate, which is fair
+# because every trial rotates and flips the seeds at random.
+#
+duplicate_genomes = False
+#
+duplicate_memory = 200
+#
+duplicate_orientation = False
+#
+assert duplicate_memory >= 0
+#
+# Headless mode: skip the work that only serves the Golly viewer,
+# such as setting the magnification and updating the view after
+# each trial. Use this for batch runs where nobody is watching.
+#
+headless_mode = False
+#
+# The engine for running seeds on an infinite plane in the analysis
+# functions, measure_growth_life(), measure_growth_management(),
+# measure_consistent_growth(), and growth_tensor(), which are used
+# by the fusion_*.py scripts:
+#
+# "golly"    = run the seeds in Golly (QuickLife)
+# "hashlife" = run the seeds in the quadtree engine (model_hashlife.py),
+#              which remembers the futures of the patterns it has seen
+#              and reuses them across seeds
+# "numpy"    = run the seeds in the NumPy plane engine (model_engine.py),
+#              on a grid that grows with the pattern
+#
+# The "hashlife" and "numpy" engines do not need a Golly process.
+#
+analysis_engine = "golly"
+#
+assert analysis_engine in ["golly", "hashlife", "numpy"]
+#
 # The size of the random sample for a tournament. The most fit
 # member of the tournament sample will be allowed to reproduce.
 #
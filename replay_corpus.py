@@ -0,0 +1,71 @@
+#
+# Replay Corpus
+#
+# Replay the contests recorded in the corpus (see corpus_interval in
+# model_parameters.py) in Golly and in each of the NumPy engines, and
+# check that every engine gives the same colour counts as the Golly
+# run that was recorded. For each engine, report the number of
+# mismatches and the speed, in cell updates per second, on these
+# realistic contests. The mismatches are listed in the log file, so
+# that they can be examined with replay_contest() in model_functions.py.
+#
+import golly as g
+import model_functions as mfunc
+import model_parameters as mparam
+import time
+#
+# Engines to compare with the recorded Golly counts.
+#
+engines = ["golly", "numpy", "bitplane", "table", "tiled", "threaded"]
+#
+# File for the results. Use suffix "tsv" for tab-separated values.
+#
+replay_path = mparam.log_directory + "/replay-corpus.tsv"
+replay_handle = open(replay_path, "w")
+#
+records = mfunc.read_corpus(mparam.corpus_path)
+#
+mfunc.show_message(g, replay_handle, "\n\nReplay Corpus\n\n")
+mfunc.show_message(g, replay_handle, "corpus: " + mparam.corpus_path + \
+  "\ncontests: " + str(len(records)) + "\n\n")
+#
+# Total cell updates in the corpus, for the full number of steps.
+#
+cell_updates = 0
+for [id1, id2, cells1, x1, y1, cells2, x2, y2, g_width, g_height, \
+  horizon_times, colours] in records:
+  cell_updates += g_width * g_height * horizon_times[-1]
+#
+mfunc.show_message(g, replay_handle, "engine\tmismatches" + \
+  "\tseconds\tcell updates per second\n")
+#
+mismatches = []
+for engine in engines:
+  num_mismatches = 0
+  start = time.time()
+  for (k, record) in enumerate(records):
+    replay_colours = mfunc.replay_contest(g, record, engine)
+    if (replay_colours != record[-1]):
+      num_mismatches += 1
+      mismatches.append([engine, k, record[-1], replay_colours])
+  seconds = time.time() - start
+  mfunc.show_message(g, replay_handle, engine + "\t" + \
+    str(num_mismatches) + "\t{:.3f}\t{:.0f}\n".format(seconds, \
+    cell_updates / max(seconds, 1e-9)))
+#
+# List the mismatches: the engine, the index of the contest in the
+# corpus, the recorded counts, and the replayed counts.
+#
+if (len(mismatches) > 0):
+  mfunc.show_message(g, replay_handle, "\nengine\tcontest" + \
+    "\trecorded\treplayed\n")
+  for [engine, k, recorded, replayed] in mismatches:
+    mfunc.show_message(g, replay_handle, engine + "\t" + str(k) + \
+      "\t" + str(recorded) + "\t" + str(replayed) + "\n")
+#
+# Final message.
+#
+mfunc.show_message(g, replay_handle, "\nReplay complete.\n")
+replay_handle.close()
+#
+#
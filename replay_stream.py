@@ -0,0 +1,63 @@
+#
+# Replay Stream
+#
+# Run the contests between two seeds again, on their own, from a
+# line of the contest stream log (see contest_streams in
+# model_parameters.py). The seeds are read from all_seed_storage.bin
+# by their unique ID numbers. The scores are shown, and, if
+# save_frames is True, every step of one trial is saved with
+# numpy.save(), as an array frames[step][x][y] of cell states.
+#
+import golly as g
+import model_functions as mfunc
+import model_parameters as mparam
+import numpy as np
+import pickle
+#
+# The line of the stream log to replay: the unique IDs of the two
+# seeds and the stream key.
+#
+ID1 = 0
+ID2 = 1
+stream_key = 0
+#
+# Save the frames of this trial (counting from 0)?
+#
+save_frames = True
+frames_trial = 0
+#
+# Read the stored seeds and find the two seeds by their IDs.
+#
+storage_path = mparam.log_directory + "/all_seed_storage.bin"
+storage_handle = open(storage_path, "rb")
+seeds = {} # maps unique ID number to seed
+while True:
+  try:
+    seed = pickle.load(storage_handle)
+    seeds[seed.unique_ID_num] = seed
+  except (EOFError, pickle.UnpicklingError):
+    break
+storage_handle.close()
+#
+seed1 = seeds[ID1]
+seed2 = seeds[ID2]
+#
+# Run the contests in the stream and show the scores.
+#
+[score1, score2] = mfunc.score_pair_stream(g, seed1, seed2, \
+  mparam.width_factor, mparam.height_factor, mparam.time_factor, \
+  mparam.num_trials, stream_key)
+message = "seeds " + str(ID1) + " and " + str(ID2) + ", stream " + \
+  str(stream_key) + ": scores {:.3f} and {:.3f}".format(score1, score2)
+#
+if (save_frames):
+  frames = mfunc.stream_frames(seed1, seed2, mparam.width_factor, \
+    mparam.height_factor, mparam.time_factor, frames_trial, stream_key)
+  frames_path = mparam.log_directory + "/stream-frames-" + str(ID1) + \
+    "-" + str(ID2) + "-" + str(stream_key) + ".npy"
+  np.save(frames_path, frames)
+  message += ", frames of trial " + str(frames_trial) + " in " + frames_path
+#
+g.show(message)
+#
+#
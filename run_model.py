@@ -89,14 +89,14 @@ message = "Building a history for initial population.\n"
 mfunc.show_message(g, log_handle, message)
 #
 # Every seed competes against every other seed (and itself)
-for i in range(pop_size):
-  # Since mfunc.update_history updates i's score for j and j's score for i,
-  # we only need to calculate the lower triangle of the matrix of scores.
-  for j in range(i + 1):
-    mfunc.update_history(g, pop, i, j, width_factor, height_factor, \
-      time_factor, num_trials)
-    # While we're here, let's update the similarities.
-    mfunc.update_similarity(pop, i, j)
+# Since mfunc.update_history updates i's score for j and j's score for i,
+# we only need to calculate the lower triangle of the matrix of scores.
+# With a farm of Golly workers, the whole triangle is scored at once.
+pairs = [[i, j] for i in range(pop_size) for j in range(i + 1)]
+mfunc.update_history_pairs(g, pop, pairs, width_factor, height_factor, \
+  time_factor, num_trials)
+# The similarities are calculated later, when they are needed (see
+# similarity_cache() in model_functions.py).
 #
 # -----------------------------------------------------------------
 # Log the average population fitness for the initial population.
@@ -231,6 +231,11 @@ avg_fit = mfunc.average_fitness(pop)
 message = "Average fitness of the final population: {:.3f}\n".format(avg_fit)
 mfunc.show_message(g, log_handle, message)
 #
+if (mparam.duplicate_genomes):
+  message = "Contests saved by duplicate genomes: {}\n".format( \
+    mfunc.contests_saved)
+  mfunc.show_message(g, log_handle, message)
+#
 end_time = time.strftime("End time: 20%y-%m-%d %Hh:%Mm:%Ss\n", time.localtime())
 mfunc.show_message(g, log_handle, end_time)
 log_handle.close()